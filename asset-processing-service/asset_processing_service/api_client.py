@@ -1,10 +1,17 @@
 from asset_processing_service.logger import logger
+import asyncio
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, Union
+import gzip
+import hashlib
+import json
+import os
+import zlib
 import aiohttp
 from asset_processing_service.config import HEADERS, config
+from asset_processing_service.metrics import downloaded_bytes_total, timed_stage, uploaded_bytes_total
 from asset_processing_service.models import Asset, AssetProcessingJob
-import tiktoken
+from asset_processing_service.token_counter import token_counter
 
 
 
@@ -14,93 +21,296 @@ class ApiError(Exception):
         self.status_code = status_code
         super().__init__(self.message)
 
-async def fetch_jobs() -> list[AssetProcessingJob]:
-    """Fetch jobs from the API and return the response."""
+
+class ApiClient:
+    """
+        Long-lived HTTP client shared by every API call.
+        Keeps a pooled keep-alive connector so heartbeats and status
+        updates reuse connections instead of handshaking on every request.
+    """
+
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+        # Set from the Accept-Encoding header on asset responses; None until seen.
+        self.accepts_gzip: Optional[bool] = None
+        # Set once the API answers a gzipped body with 415; never cleared.
+        self.gzip_rejected = False
+
+    async def start(self) -> None:
+        if self._session is not None and not self._session.closed:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=config.HTTP_MAX_CONNECTIONS,
+            limit_per_host=config.HTTP_MAX_CONNECTIONS_PER_HOST,
+            keepalive_timeout=config.HTTP_KEEPALIVE_TIMEOUT_SECONDS,
+            ttl_dns_cache=config.HTTP_DNS_CACHE_TTL_SECONDS,
+            use_dns_cache=True,
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=None,
+            connect=config.HTTP_CONNECT_TIMEOUT_SECONDS,
+            sock_read=config.HTTP_READ_TIMEOUT_SECONDS,
+        )
+        self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        logger.info(
+            f"API client started (max connections: {config.HTTP_MAX_CONNECTIONS}, "
+            f"per host: {config.HTTP_MAX_CONNECTIONS_PER_HOST})"
+        )
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def note_accept_encoding(self, response: aiohttp.ClientResponse) -> None:
+        """
+            Remember whether the API accepts gzipped request bodies. A header
+            never overrides an actual 415 rejection.
+        """
+        accept_encoding = response.headers.get("Accept-Encoding")
+        if accept_encoding is not None and not self.gzip_rejected:
+            self.accepts_gzip = "gzip" in accept_encoding.lower()
+
+    async def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            await self.start()
+        return self._session
+
+
+api_client = ApiClient()
+
+
+async def fetch_jobs(statuses: Optional[List[str]] = None, limit: Optional[int] = None) -> list[AssetProcessingJob]:
+    """
+        Fetch non-terminal jobs from the API, optionally filtered by status
+        and capped at limit. Only the returned slice is parsed into models.
+    """
     try:
         url = f"{config.API_BASE_URL}/asset-processing-job"
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=HEADERS) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    jobs = [AssetProcessingJob(**item) for item in data]
-                    return jobs
-                else:
-                    logger.error(f"Error fetching jobs: {response.status}")
-                    return []
+        params = {}
+        if statuses:
+            params["status"] = ",".join(statuses)
+        if limit is not None:
+            params["limit"] = str(limit)
+        session = await api_client.session()
+        async with session.get(url, headers=HEADERS, params=params) as response:
+            if response.status == 200:
+                data = await response.json()
+                if limit is not None:
+                    data = data[:limit]
+                jobs = [AssetProcessingJob(**item) for item in data]
+                return jobs
+            else:
+                logger.error(f"Error fetching jobs: {response.status}", extra={"rate_limit": "fetch_jobs"})
+                return []
     except aiohttp.ClientError as error:
-        logger.error(f"Error fetching jobs: {error}")
+        logger.error(f"Error fetching jobs: {error}", extra={"rate_limit": "fetch_jobs"})
         return []
-    
+
 
 async def update_job_details(job_id: str, update_data: Dict[str, Any]) -> None:
     data = {**update_data, "lastHeartBeat": datetime.now().isoformat()}
     try:
         url = f"{config.API_BASE_URL}/asset-processing-job?jobId={job_id}"
-        async with aiohttp.ClientSession() as session:
-            async with session.patch(url, headers=HEADERS, json=data) as response:
-                response.raise_for_status()
+        session = await api_client.session()
+        async with session.patch(url, headers=HEADERS, json=data) as response:
+            response.raise_for_status()
     except aiohttp.ClientError as error:
         logger.error(f"Error updating job details for job {job_id}: {error}")
-        
-        
+
+
 async def update_job_heartbeat(job_id: str) -> None:
     data = {"lastHeartBeat": datetime.now().isoformat()}
     try:
         url = f"{config.API_BASE_URL}/asset-processing-job?jobId={job_id}"
-        async with aiohttp.ClientSession() as session:
-            async with session.patch(url, headers=HEADERS, json=data) as response:
-                response.raise_for_status()
+        session = await api_client.session()
+        async with session.patch(url, headers=HEADERS, json=data) as response:
+            response.raise_for_status()
     except aiohttp.ClientError as error:
         logger.error(f"Error updating job heartbeat for job {job_id}: {error}")
-                    
-                    
+
+
 async def fetch_asset(asset_id: str) -> Optional[Asset]:
     """Fetch asset from the API and return the response."""
     try:
         url = f"{config.API_BASE_URL}/asset?assetId={asset_id}"
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=HEADERS) as response:
-                if response.status == 200:
-                    data = await response.json()                    
-                    if data:
-                        return Asset(**data)
-                    else:
-                        return None
+        session = await api_client.session()
+        async with session.get(url, headers=HEADERS) as response:
+            if response.status == 200:
+                api_client.note_accept_encoding(response)
+                data = await response.json()
+                if data:
+                    return Asset(**data)
                 else:
-                    logger.error(f"Error fetching asset: {response.status}")
                     return None
-                
+            else:
+                logger.error(f"Error fetching asset: {response.status}")
+                return None
+
     except aiohttp.ClientError as error:
         logger.error(f"Error fetching jobs: {error}")
         return []
-    
-async def fetch_asset_file(file_url: str) -> bytes:
+
+def _write_and_hash(f, digest, chunk: bytes) -> None:
+    f.write(chunk)
+    digest.update(chunk)
+
+
+async def iter_asset_file(file_url: str) -> AsyncIterator[bytes]:
+    """
+        Yield the asset file in fixed-size chunks as it downloads, so callers
+        can process it without holding more than one chunk in memory.
+    """
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(file_url) as response:
-                response.raise_for_status()
-                return await response.read()
+        session = await api_client.session()
+        async with session.get(file_url) as response:
+            response.raise_for_status()
+            async for chunk in response.content.iter_chunked(config.DOWNLOAD_CHUNK_SIZE_BYTES):
+                downloaded_bytes_total.inc(len(chunk))
+                yield chunk
     except aiohttp.ClientError as error:
-        logger.error(f"Error fetching asset file: {error}")
+        logger.error(f"Error downloading asset file: {error}")
         raise ApiError("Error fetching asset file", status_code=500)
-    
-async def update_asset_content(asset_id: str, content: str) -> None:
-    data = {"content": content}
+
+
+async def download_asset_file(file_url: str, destination_path: str) -> Tuple[int, str]:
+    """
+        Stream the asset file to disk in fixed-size chunks so memory stays
+        bounded regardless of the asset size. Returns the number of bytes
+        written and the SHA-256 of the content.
+    """
+    bytes_written = 0
+    digest = hashlib.sha256()
+    with open(destination_path, "wb") as f:
+        async for chunk in iter_asset_file(file_url):
+            await asyncio.to_thread(_write_and_hash, f, digest, chunk)
+            bytes_written += len(chunk)
+    logger.info(f"Downloaded asset file to {destination_path} ({bytes_written} bytes)")
+    return bytes_written, digest.hexdigest()
+
+def _gzip_enabled(size: int) -> bool:
+    """
+        Whether to gzip an upload of about size bytes. In "auto" mode only
+        once the API has advertised gzip in an Accept-Encoding header. Never
+        after the API has rejected a gzipped body.
+    """
+    if config.UPLOAD_GZIP == "never" or api_client.gzip_rejected or size < config.UPLOAD_GZIP_MIN_BYTES:
+        return False
+    return config.UPLOAD_GZIP == "always" or api_client.accepts_gzip is True
+
+
+async def _memory_text(content: str) -> AsyncIterator[str]:
+    for start in range(0, len(content), config.UPLOAD_CHUNK_CHARS):
+        yield content[start:start + config.UPLOAD_CHUNK_CHARS]
+
+
+async def _file_text(content_path: str) -> AsyncIterator[str]:
+    with open(content_path, "r", encoding="utf-8", newline="") as f:
+        while True:
+            text = await asyncio.to_thread(f.read, config.UPLOAD_CHUNK_CHARS)
+            if not text:
+                break
+            yield text
+
+
+async def _content_body(pieces: AsyncIterator[str], token_count: int) -> AsyncIterator[bytes]:
+    """
+        The same JSON body as json.dumps({"content": ..., "tokenCount": ...}),
+        encoded piece by piece so the whole body never exists at once.
+    """
+    yield b'{"content": "'
+    async for text in pieces:
+        yield json.dumps(text)[1:-1].encode("utf-8")
+    yield f'", "tokenCount": {token_count}}}'.encode("utf-8")
+
+
+async def _gzip_stream(body: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(config.UPLOAD_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for piece in body:
+        compressed = await asyncio.to_thread(compressor.compress, piece)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+async def _counted(body: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    async for piece in body:
+        uploaded_bytes_total.inc(len(piece))
+        yield piece
+
+
+async def _patch_asset_content(
+    asset_id: str,
+    make_body: Callable[[], Union[bytes, AsyncIterator[bytes]]],
+    size: int,
+) -> None:
+    """
+        PATCH the asset content, gzipped when _gzip_enabled allows it. A 415
+        reply to a gzipped body turns compression off and resends it plain.
+    """
+    url = f"{config.API_BASE_URL}/asset?assetId={asset_id}"
+    compress = _gzip_enabled(size)
+    session = await api_client.session()
+    while True:
+        headers = {**HEADERS, "Content-Type": "application/json"}
+        body = make_body()
+        if compress:
+            headers["Content-Encoding"] = "gzip"
+            if isinstance(body, bytes):
+                body = await asyncio.to_thread(gzip.compress, body, config.UPLOAD_GZIP_LEVEL)
+            else:
+                body = _gzip_stream(body)
+        async with session.patch(
+            url, headers=headers, data=body if isinstance(body, bytes) else _counted(body)
+        ) as response:
+            if response.status == 415 and compress:
+                logger.info("API rejected a gzipped upload. Sending uncompressed from now on.")
+                api_client.gzip_rejected = True
+                api_client.accepts_gzip = False
+                compress = False
+                continue
+            response.raise_for_status()
+            api_client.note_accept_encoding(response)
+        if isinstance(body, bytes):
+            uploaded_bytes_total.inc(len(body))
+        return
+
+
+async def update_asset_content(asset_id: str, content: str, token_count: Optional[int] = None) -> int:
+    """
+        Upload content and its token count. Content longer than
+        UPLOAD_STREAM_THRESHOLD_CHARS is sent as a streamed body.
+    """
     try:
-        encoding = tiktoken.encoding_for_model("gpt-4o")
-        tokens = encoding.encode(content)
-        token_count = len(tokens)
-        
-        update_data = {
-            "content": content,
-            "tokenCount": token_count,
-        }        
-        url = f"{config.API_BASE_URL}/asset?assetId={asset_id}"
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.patch(url, headers=HEADERS, json=update_data) as response:
-                response.raise_for_status()
-                
+        if token_count is None:
+            with timed_stage("count_tokens"):
+                token_count = await token_counter.count(content)
+
+        if len(content) > config.UPLOAD_STREAM_THRESHOLD_CHARS:
+            make_body = lambda: _content_body(_memory_text(content), token_count)
+        else:
+            body = json.dumps({"content": content, "tokenCount": token_count}).encode("utf-8")
+            make_body = lambda: body
+        await _patch_asset_content(asset_id, make_body, len(content))
+        return token_count
+
+    except aiohttp.ClientError as error:
+        logger.error(f"Error updating asset content for asset {asset_id}: {error}")
+        raise ApiError("Error updating asset content", status_code=500)
+
+
+async def update_asset_content_file(asset_id: str, content_path: str, token_count: int) -> int:
+    """
+        Upload content spooled to content_path, streaming the request body.
+    """
+    try:
+        await _patch_asset_content(
+            asset_id,
+            lambda: _content_body(_file_text(content_path), token_count),
+            os.path.getsize(content_path),
+        )
+        return token_count
+
     except aiohttp.ClientError as error:
         logger.error(f"Error updating asset content for asset {asset_id}: {error}")
         raise ApiError("Error updating asset content", status_code=500)
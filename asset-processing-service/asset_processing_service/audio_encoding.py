@@ -0,0 +1,122 @@
+import bisect
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from asset_processing_service.config import Config
+
+# Encoding profiles for the MP3 segments sent to transcription. "speech"
+# matches what speech recognition actually uses (16 kHz mono), "standard"
+# keeps the source sample rate and channels at the previous bitrate.
+ENCODING_PROFILES: Dict[str, Dict[str, Optional[int]]] = {
+    "speech": {"sample_rate": 16000, "channels": 1, "bitrate_kbps": 32},
+    "standard": {"sample_rate": None, "channels": None, "bitrate_kbps": 192},
+}
+
+SILENCE_PATTERN = re.compile(r"silence_(start|end): (-?\d+(?:\.\d+)?)")
+
+
+def encoding_profile() -> Dict[str, Optional[int]]:
+    """The configured profile, with any AUDIO_* overrides applied."""
+    if Config.AUDIO_PROFILE not in ENCODING_PROFILES:
+        raise ValueError(f"Unknown audio profile: {Config.AUDIO_PROFILE}")
+    profile = dict(ENCODING_PROFILES[Config.AUDIO_PROFILE])
+    if Config.AUDIO_SAMPLE_RATE:
+        profile["sample_rate"] = Config.AUDIO_SAMPLE_RATE
+    if Config.AUDIO_CHANNELS:
+        profile["channels"] = Config.AUDIO_CHANNELS
+    if Config.AUDIO_BITRATE_KBPS:
+        profile["bitrate_kbps"] = Config.AUDIO_BITRATE_KBPS
+    return profile
+
+
+def segmentation_settings() -> str:
+    """
+        Everything besides the source content that decides where an asset is
+        cut into segments and how they are encoded, and so what the joined
+        transcript says. Part of the asset-level transcript cache key.
+    """
+    # The streaming pipeline always cuts at fixed lengths.
+    silence_split = Config.SILENCE_SPLIT and not Config.STREAMING_PIPELINE
+    settings: Dict[str, Any] = {
+        "profile": encoding_profile(),
+        "max_chunk_size_bytes": Config.MAX_CHUNK_SIZE_BYTES,
+        "silence_split": silence_split,
+    }
+    if silence_split:
+        settings["silence_noise_db"] = Config.SILENCE_NOISE_DB
+        settings["silence_min_seconds"] = Config.SILENCE_MIN_SECONDS
+    return json.dumps(settings, sort_keys=True)
+
+
+def profile_output_options(profile: Dict[str, Optional[int]]) -> Dict[str, Any]:
+    options: Dict[str, Any] = {
+        "acodec": "libmp3lame",
+        "audio_bitrate": f"{profile['bitrate_kbps']}k",
+    }
+    if profile["sample_rate"]:
+        options["ar"] = profile["sample_rate"]
+    if profile["channels"]:
+        options["ac"] = profile["channels"]
+    return options
+
+
+def parse_silences(ffmpeg_stderr: str) -> List[Tuple[float, float]]:
+    """(start, end) pairs from silencedetect output. A trailing open silence is dropped."""
+    silences = []
+    start = None
+    for kind, value in SILENCE_PATTERN.findall(ffmpeg_stderr):
+        if kind == "start":
+            start = float(value)
+        elif start is not None:
+            silences.append((max(0.0, start), float(value)))
+            start = None
+    return silences
+
+
+def detect_silences(input_path: str) -> List[Tuple[float, float]]:
+    """
+        Decode the first audio stream once and return its silent stretches.
+        Audio is downmixed to 16 kHz mono first, which is enough for detection.
+    """
+    import ffmpeg
+
+    stream = ffmpeg.input(input_path).output(
+        "-",
+        format="null",
+        map="0:a:0",
+        af=f"silencedetect=noise={Config.SILENCE_NOISE_DB}dB:d={Config.SILENCE_MIN_SECONDS}",
+        ac=1,
+        ar=16000,
+    ).global_args("-hide_banner", "-nostats")
+    _, stderr = ffmpeg.run(stream, capture_stdout=True, capture_stderr=True)
+    return parse_silences(stderr.decode("utf-8", errors="replace"))
+
+
+def choose_split_points(
+    duration: float,
+    max_segment_seconds: float,
+    silences: List[Tuple[float, float]],
+    min_fraction: float = 0.5,
+) -> Tuple[List[float], int]:
+    """
+        Cut times that keep every segment within max_segment_seconds. Each cut
+        is the latest silence midpoint in the back half of the allowed window,
+        or the window limit when there is no silence there. Returns the cuts
+        and how many of them landed in a silence.
+    """
+    midpoints = sorted((start + end) / 2 for start, end in silences)
+    cuts: List[float] = []
+    at_silence = 0
+    start = 0.0
+    while duration - start > max_segment_seconds:
+        limit = start + max_segment_seconds
+        earliest = start + max_segment_seconds * min_fraction
+        index = bisect.bisect_right(midpoints, limit) - 1
+        if index >= 0 and midpoints[index] >= earliest:
+            cut = midpoints[index]
+            at_silence += 1
+        else:
+            cut = limit
+        cuts.append(cut)
+        start = cut
+    return cuts, at_silence
@@ -0,0 +1,220 @@
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+from asset_processing_service.config import Config
+from asset_processing_service.logger import logger
+from asset_processing_service.scheduler import JobScheduler
+
+# Weight of the newest sample in the per-job memory and idle baseline averages.
+MEMORY_SMOOTHING = 0.3
+
+
+def read_memory() -> Tuple[int, int]:
+    """
+        (used, limit) in bytes. Uses the cgroup v2 figures when a memory limit
+        is set, without reclaimable page cache. Otherwise uses the host's
+        /proc/meminfo. Returns (0, 0) when neither can be read.
+    """
+    try:
+        with open("/sys/fs/cgroup/memory.max", "r") as f:
+            limit = f.read().strip()
+        if limit != "max":
+            with open("/sys/fs/cgroup/memory.current", "r") as f:
+                used = int(f.read())
+            with open("/sys/fs/cgroup/memory.stat", "r") as f:
+                stats = dict(line.split() for line in f if line.strip())
+            return max(0, used - int(stats.get("inactive_file", 0))), int(limit)
+    except (OSError, ValueError):
+        pass
+    try:
+        info = {}
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                name, value = line.split(":", 1)
+                info[name] = int(value.split()[0]) * 1024
+        return info["MemTotal"] - info["MemAvailable"], info["MemTotal"]
+    except (OSError, KeyError, ValueError):
+        return 0, 0
+
+
+def read_load_per_cpu() -> float:
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except OSError:
+        return 0.0
+
+
+class WorkerPool:
+    """
+        The worker tasks of this process, resized at runtime. A retired worker
+        that is waiting for a job stops at once. A busy one finishes its
+        current job and exits before taking another.
+    """
+
+    def __init__(self, run_worker: Callable[[int], Awaitable[None]]):
+        self._run_worker = run_worker
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._idle: Set[int] = set()
+        self._retiring: Set[int] = set()
+        self._next_id = 1
+
+    @property
+    def size(self) -> int:
+        """Workers that will keep taking jobs, so not counting retiring ones."""
+        return len(self._tasks) - len(self._retiring)
+
+    @property
+    def busy(self) -> int:
+        return len(self._tasks) - len(self._idle)
+
+    def mark_idle(self, worker_id: int) -> None:
+        self._idle.add(worker_id)
+
+    def mark_busy(self, worker_id: int) -> None:
+        self._idle.discard(worker_id)
+
+    def should_retire(self, worker_id: int) -> bool:
+        return worker_id in self._retiring
+
+    def _forget(self, worker_id: int) -> None:
+        self._tasks.pop(worker_id, None)
+        self._idle.discard(worker_id)
+        self._retiring.discard(worker_id)
+
+    def resize(self, target: int) -> None:
+        while self.size < target:
+            if self._retiring:
+                # Keep a busy worker that was due to retire rather than starting a new one.
+                self._retiring.pop()
+                continue
+            worker_id = self._next_id
+            self._next_id += 1
+            task = asyncio.create_task(self._run_worker(worker_id))
+            task.add_done_callback(lambda _, worker_id=worker_id: self._forget(worker_id))
+            self._tasks[worker_id] = task
+            self._idle.add(worker_id)
+        excess = self.size - target
+        for worker_id in sorted(self._idle)[:max(0, excess)]:
+            # Idle workers are parked in JobScheduler.get, which is safe to cancel.
+            self._idle.discard(worker_id)
+            self._tasks.pop(worker_id).cancel()
+            excess -= 1
+        for worker_id in sorted(set(self._tasks) - self._retiring)[:max(0, excess)]:
+            self._retiring.add(worker_id)
+
+    async def stop(self) -> None:
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class Autoscaler:
+    """
+        Sizes the worker pool between MIN_NUM_WORKERS and MAX_NUM_WORKERS.
+        The target follows demand, meaning busy workers plus queued jobs.
+        It grows only while the memory left under AUTOSCALE_MEMORY_TARGET
+        fits another job and the load per CPU is below
+        AUTOSCALE_MAX_LOAD_PER_CPU. Memory per job is estimated from what
+        running jobs actually use. The pool shrinks once demand has stayed
+        low for AUTOSCALE_SCALE_DOWN_DELAY_SECONDS, and at once under
+        memory pressure.
+    """
+
+    def __init__(
+        self,
+        pool: WorkerPool,
+        job_queue: JobScheduler,
+        min_workers: int = Config.MIN_NUM_WORKERS,
+        max_workers: int = Config.MAX_NUM_WORKERS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.pool = pool
+        self.job_queue = job_queue
+        self.min_workers = max(1, min_workers)
+        self.max_workers = max(self.min_workers, max_workers)
+        self.clock = clock
+        self.job_memory_bytes = float(Config.AUTOSCALE_JOB_MEMORY_BYTES)
+        self._idle_memory_bytes: Optional[float] = None
+        self._low_demand_since: Optional[float] = None
+        self._last_reason: Optional[str] = None
+
+    def observe_memory(self, used: int, busy: int) -> None:
+        """Update the idle baseline, or the per-job estimate while jobs run."""
+        if busy == 0 or self._idle_memory_bytes is None:
+            if busy == 0:
+                self._idle_memory_bytes = self._smooth(self._idle_memory_bytes, used)
+            return
+        per_job = max(0.0, used - self._idle_memory_bytes) / busy
+        self.job_memory_bytes = self._smooth(self.job_memory_bytes, per_job)
+
+    @staticmethod
+    def _smooth(average: Optional[float], sample: float) -> float:
+        if average is None:
+            return float(sample)
+        return average + MEMORY_SMOOTHING * (sample - average)
+
+    def memory_allowance(self, busy: int, used: int, limit: int) -> int:
+        """Workers that fit in memory: the busy ones plus as many more jobs as the headroom holds."""
+        if not limit:
+            return self.max_workers
+        headroom = limit * Config.AUTOSCALE_MEMORY_TARGET - used
+        return busy + max(0, int(headroom // max(1.0, self.job_memory_bytes)))
+
+    def decide(self, current: int, busy: int, queued: int, used: int, limit: int, load_per_cpu: float) -> Tuple[int, str]:
+        demand = busy + queued
+        wanted = max(self.min_workers, min(self.max_workers, demand))
+        allowed = max(self.min_workers, self.memory_allowance(busy, used, limit))
+
+        if allowed < current:
+            self._low_demand_since = None
+            return allowed, "memory pressure"
+        if wanted > current:
+            self._low_demand_since = None
+            if load_per_cpu >= Config.AUTOSCALE_MAX_LOAD_PER_CPU:
+                return current, "scale-up blocked by CPU load"
+            if allowed <= current:
+                return current, "scale-up blocked by memory"
+            return min(wanted, allowed), "demand above capacity"
+        if wanted < current:
+            now = self.clock()
+            if self._low_demand_since is None:
+                self._low_demand_since = now
+            if now - self._low_demand_since < Config.AUTOSCALE_SCALE_DOWN_DELAY_SECONDS:
+                return current, "waiting to scale down"
+            self._low_demand_since = None
+            return wanted, "demand below capacity"
+        self._low_demand_since = None
+        return current, "steady"
+
+    def step(self) -> None:
+        current = self.pool.size
+        busy = self.pool.busy
+        queued = self.job_queue.qsize()
+        used, limit = read_memory()
+        load_per_cpu = read_load_per_cpu()
+        self.observe_memory(used, busy)
+        target, reason = self.decide(current, busy, queued, used, limit, load_per_cpu)
+
+        # Log every resize, and every change in why the pool is held where it is.
+        if target != current or reason != self._last_reason:
+            logger.info(
+                f"Autoscaler: {current} -> {target} workers ({reason}). "
+                f"busy={busy} queued={queued} "
+                f"memory={used / 2**20:.0f}/{limit / 2**20:.0f} MiB "
+                f"per_job={self.job_memory_bytes / 2**20:.0f} MiB "
+                f"load_per_cpu={load_per_cpu:.2f}"
+            )
+        self._last_reason = reason
+        if target != current:
+            self.pool.resize(target)
+
+    async def run(self) -> None:
+        self.pool.resize(self.min_workers)
+        while True:
+            try:
+                self.step()
+            except Exception as e:
+                logger.error(f"Autoscaler failed: {e}")
+            await asyncio.sleep(Config.AUTOSCALE_INTERVAL_SECONDS)
@@ -0,0 +1,150 @@
+import asyncio
+import json
+import os
+import shutil
+import time
+from typing import Any, Collection, Dict, Optional
+from asset_processing_service.config import Config
+from asset_processing_service.logger import logger
+
+
+def job_work_dir(job_id: str) -> str:
+    return os.path.join(Config.WORK_DIR, job_id)
+
+
+def _write_json(path: str, data: Any) -> None:
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(temp_path, path)
+
+
+class JobCheckpoint:
+    """
+        Records which pipeline stages of a job are finished, in a JSON file
+        inside the job's working directory, so a retried attempt on the same
+        node resumes at the first incomplete stage. Chunk transcripts are
+        kept in a file each under CHUNKS_DIR, so saving one never rewrites
+        the others.
+    """
+
+    FILE_NAME = "checkpoint.json"
+    CHUNKS_DIR = "transcripts"
+
+    def __init__(self, job_id: str, asset_id: str):
+        self.job_id = job_id
+        self.asset_id = asset_id
+        self.work_dir = job_work_dir(job_id)
+        self.path = os.path.join(self.work_dir, self.FILE_NAME)
+        self.chunks_dir = os.path.join(self.work_dir, self.CHUNKS_DIR)
+        self.state: Dict[str, Any] = {"asset_id": asset_id, "stages": {}}
+        self.chunks: Dict[int, Dict[str, Any]] = {}
+
+    @classmethod
+    def load(cls, job_id: str, asset_id: str) -> "JobCheckpoint":
+        """Read the checkpoint and every saved chunk transcript. Blocking; call it off the event loop."""
+        checkpoint = cls(job_id, asset_id)
+        os.makedirs(checkpoint.work_dir, exist_ok=True)
+        try:
+            with open(checkpoint.path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            checkpoint.clear_chunks()
+            return checkpoint
+        except (OSError, ValueError) as e:
+            logger.error(f"Ignoring unreadable checkpoint for job {job_id}: {e}")
+            checkpoint.clear_chunks()
+            return checkpoint
+
+        if state.get("asset_id") != asset_id:
+            logger.info(f"Checkpoint for job {job_id} belongs to another asset. Starting over.")
+            checkpoint.clear_chunks()
+            return checkpoint
+        state.pop("chunks", None)
+        checkpoint.state = state
+        checkpoint.load_chunks()
+        logger.info(
+            f"Resuming job {job_id} with completed stages: {list(state['stages'])}, "
+            f"{len(checkpoint.chunks)} chunk transcripts"
+        )
+        return checkpoint
+
+    def _chunk_path(self, index: int) -> str:
+        return os.path.join(self.chunks_dir, f"chunk_{index:05d}.json")
+
+    def load_chunks(self) -> None:
+        if not os.path.isdir(self.chunks_dir):
+            return
+        for name in os.listdir(self.chunks_dir):
+            if not (name.startswith("chunk_") and name.endswith(".json")):
+                continue
+            try:
+                with open(os.path.join(self.chunks_dir, name), "r", encoding="utf-8") as f:
+                    self.chunks[int(name[len("chunk_"):-len(".json")])] = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.error(f"Ignoring unreadable chunk transcript {name} for job {self.job_id}: {e}")
+
+    def clear_chunks(self) -> None:
+        """Drop transcripts left by an attempt whose checkpoint no longer applies."""
+        shutil.rmtree(self.chunks_dir, ignore_errors=True)
+        self.chunks = {}
+
+    def save(self) -> None:
+        _write_json(self.path, self.state)
+
+    def is_done(self, stage: str) -> bool:
+        return stage in self.state["stages"]
+
+    def get(self, stage: str) -> Optional[Dict[str, Any]]:
+        return self.state["stages"].get(stage)
+
+    def mark_done(self, stage: str, **data) -> None:
+        self.state["stages"][stage] = data
+        self.save()
+
+    def chunk_transcript(self, index: int, sha256: str) -> Optional[Dict[str, Any]]:
+        """The transcript saved for chunk index, if it was made from a segment with this content."""
+        record = self.chunks.get(index)
+        if record is None or record.get("sha256") != sha256:
+            return None
+        return record
+
+    def _write_chunk(self, index: int, record: Dict[str, Any]) -> None:
+        os.makedirs(self.chunks_dir, exist_ok=True)
+        _write_json(self._chunk_path(index), record)
+
+    async def save_chunk_transcript(self, index: int, sha256: str, text: str, token_count: int) -> None:
+        record = {"sha256": sha256, "text": text, "token_count": token_count}
+        await asyncio.to_thread(self._write_chunk, index, record)
+        self.chunks[index] = record
+
+    def remove(self) -> None:
+        remove_checkpoint(self.job_id)
+
+
+def remove_checkpoint(job_id: str) -> None:
+    work_dir = job_work_dir(job_id)
+    if os.path.isdir(work_dir):
+        shutil.rmtree(work_dir, ignore_errors=True)
+        logger.info(f"Removed checkpoint for job {job_id}")
+
+
+def remove_stale_checkpoints(max_age_seconds: float, active_job_ids: Collection[str] = ()) -> None:
+    """
+        Remove working directories untouched for max_age_seconds, except those
+        of jobs this node still holds. Catches jobs that finished on another
+        node and so were never cleaned up here.
+    """
+    if not os.path.isdir(Config.WORK_DIR):
+        return
+    cutoff = time.time() - max_age_seconds
+    for name in os.listdir(Config.WORK_DIR):
+        if name in active_job_ids:
+            continue
+        path = os.path.join(Config.WORK_DIR, name)
+        try:
+            if os.path.isdir(path) and os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+                logger.info(f"Removed stale checkpoint {name}")
+        except OSError:
+            continue
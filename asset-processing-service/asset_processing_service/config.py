@@ -14,12 +14,80 @@ class Config:
     API_BASE_URL = os.getenv("API_BASE_URL", "http://192.168.1.100:3000/api")
     SERVER_API_KEY = get_required_env("SERVER_API_KEY")
     STUCK_JOB_THRESHOLD_SECONDS = int(os.getenv("STUCK_JOB_THRESHOLD_SECONDS", 30))
+    STUCK_JOB_CHECK_INTERVAL_SECONDS = float(os.getenv("STUCK_JOB_CHECK_INTERVAL_SECONDS", 10))
+    JOB_POLL_MIN_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_MIN_INTERVAL_SECONDS", 1))
+    JOB_POLL_MAX_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_MAX_INTERVAL_SECONDS", 15))
     MAX_JOB_ATTEMPTS = int(os.getenv("MAX_JOB_ATTEMPTS", 3))
+    MIN_NUM_WORKERS = int(os.getenv("MIN_NUM_WORKERS", 1))
     MAX_NUM_WORKERS = int(os.getenv("MAX_NUM_WORKERS", 2))
+    AUTOSCALE_INTERVAL_SECONDS = float(os.getenv("AUTOSCALE_INTERVAL_SECONDS", 5))
+    AUTOSCALE_SCALE_DOWN_DELAY_SECONDS = float(os.getenv("AUTOSCALE_SCALE_DOWN_DELAY_SECONDS", 60))
+    AUTOSCALE_MEMORY_TARGET = float(os.getenv("AUTOSCALE_MEMORY_TARGET", 0.8))
+    AUTOSCALE_JOB_MEMORY_BYTES = int(os.getenv("AUTOSCALE_JOB_MEMORY_BYTES", str(512 * 1024 * 1024)))
+    AUTOSCALE_MAX_LOAD_PER_CPU = float(os.getenv("AUTOSCALE_MAX_LOAD_PER_CPU", 1.5))
+    WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", 1))
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+    LOG_MAX_MESSAGE_CHARS = int(os.getenv("LOG_MAX_MESSAGE_CHARS", 2000))
+    LOG_RATE_LIMIT_SECONDS = float(os.getenv("LOG_RATE_LIMIT_SECONDS", 10))
+    LOG_RATE_LIMIT_MAX_KEYS = int(os.getenv("LOG_RATE_LIMIT_MAX_KEYS", 1024))
+    METRICS_PORT = int(os.getenv("METRICS_PORT", 0))
+    METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+    WORKER_SHUTDOWN_TIMEOUT_SECONDS = float(os.getenv("WORKER_SHUTDOWN_TIMEOUT_SECONDS", 30))
+    SCHEDULER_LOOKAHEAD = int(os.getenv("SCHEDULER_LOOKAHEAD", 4))
+    SCHEDULER_AGING_WEIGHT = float(os.getenv("SCHEDULER_AGING_WEIGHT", 1))
+    SCHEDULER_MAX_WAIT_SECONDS = float(os.getenv("SCHEDULER_MAX_WAIT_SECONDS", 30 * 60))
+    SCHEDULER_FAIR_SHARE_WEIGHT = float(os.getenv("SCHEDULER_FAIR_SHARE_WEIGHT", 1))
     HEARTBEAT_INTERVAL_SECONDS = int(os.getenv("HEARTBEAT_INTERVAL_SECONDS", 10))
+    JOB_UPDATE_FLUSH_INTERVAL_SECONDS = float(os.getenv("JOB_UPDATE_FLUSH_INTERVAL_SECONDS", 1))
+    JOB_UPDATE_BATCH_SIZE = int(os.getenv("JOB_UPDATE_BATCH_SIZE", 50))
     MAX_CHUNK_SIZE_BYTES = int(os.getenv("MAX_CHUNK_SIZE_BYTES", str(24 * 1024 * 1024)))
+    AUDIO_PROFILE = os.getenv("AUDIO_PROFILE", "speech")
+    # Overrides for the profile's settings; 0 keeps the profile value.
+    AUDIO_BITRATE_KBPS = int(os.getenv("AUDIO_BITRATE_KBPS", 0))
+    AUDIO_SAMPLE_RATE = int(os.getenv("AUDIO_SAMPLE_RATE", 0))
+    AUDIO_CHANNELS = int(os.getenv("AUDIO_CHANNELS", 0))
+    # Only applies without STREAMING_PIPELINE, which cuts at fixed lengths so the first segment is not delayed.
+    SILENCE_SPLIT = os.getenv("SILENCE_SPLIT", "true").lower() in ("1", "true", "yes")
+    SILENCE_NOISE_DB = float(os.getenv("SILENCE_NOISE_DB", -35))
+    SILENCE_MIN_SECONDS = float(os.getenv("SILENCE_MIN_SECONDS", 0.4))
+    STREAMING_PIPELINE = os.getenv("STREAMING_PIPELINE", "true").lower() in ("1", "true", "yes")
     OPENAI_MODEL = os.getenv("OPENAI_MODEL", "whisper-1")
     OPENAI_API_KEY = get_required_env("OPENAI_API_KEY")
+    TOKEN_COUNT_MODEL = os.getenv("TOKEN_COUNT_MODEL", "gpt-4o")
+    TOKEN_COUNT_WORKERS = int(os.getenv("TOKEN_COUNT_WORKERS", 2))
+    TRANSCRIPTION_BACKEND = os.getenv("TRANSCRIPTION_BACKEND", "openai")
+    TRANSCRIPTION_MAX_CONCURRENCY = int(os.getenv("TRANSCRIPTION_MAX_CONCURRENCY", 8))
+    TRANSCRIPTION_MAX_RETRIES = int(os.getenv("TRANSCRIPTION_MAX_RETRIES", 5))
+    TRANSCRIPTION_BACKOFF_BASE_SECONDS = float(os.getenv("TRANSCRIPTION_BACKOFF_BASE_SECONDS", 1))
+    TRANSCRIPTION_BACKOFF_MAX_SECONDS = float(os.getenv("TRANSCRIPTION_BACKOFF_MAX_SECONDS", 60))
+    FAKE_TRANSCRIPTION_LATENCY_SECONDS = float(os.getenv("FAKE_TRANSCRIPTION_LATENCY_SECONDS", 0.5))
+    HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 100))
+    HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", 20))
+    HTTP_KEEPALIVE_TIMEOUT_SECONDS = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT_SECONDS", 30))
+    HTTP_DNS_CACHE_TTL_SECONDS = int(os.getenv("HTTP_DNS_CACHE_TTL_SECONDS", 300))
+    HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", 10))
+    HTTP_READ_TIMEOUT_SECONDS = float(os.getenv("HTTP_READ_TIMEOUT_SECONDS", 60))
+    DOWNLOAD_CHUNK_SIZE_BYTES = int(os.getenv("DOWNLOAD_CHUNK_SIZE_BYTES", str(1024 * 1024)))
+    UPLOAD_CHUNK_CHARS = int(os.getenv("UPLOAD_CHUNK_CHARS", str(1024 * 1024)))
+    # "auto" gzips uploads once the API advertises support, "always" or "never" force it.
+    UPLOAD_GZIP = os.getenv("UPLOAD_GZIP", "auto").lower()
+    UPLOAD_GZIP_MIN_BYTES = int(os.getenv("UPLOAD_GZIP_MIN_BYTES", str(16 * 1024)))
+    UPLOAD_GZIP_LEVEL = int(os.getenv("UPLOAD_GZIP_LEVEL", 6))
+    UPLOAD_STREAM_THRESHOLD_CHARS = int(os.getenv("UPLOAD_STREAM_THRESHOLD_CHARS", str(8 * 1024 * 1024)))
+    TEXT_DETECT_BYTES = int(os.getenv("TEXT_DETECT_BYTES", str(64 * 1024)))
+    TEXT_FALLBACK_ENCODING = os.getenv("TEXT_FALLBACK_ENCODING", "cp1252")
+    WORK_DIR = os.getenv("WORK_DIR", os.path.join(os.getcwd(), "temp"))
+    CHECKPOINT_MAX_AGE_SECONDS = int(os.getenv("CHECKPOINT_MAX_AGE_SECONDS", 24 * 60 * 60))
+    CHECKPOINT_SWEEP_INTERVAL_SECONDS = float(os.getenv("CHECKPOINT_SWEEP_INTERVAL_SECONDS", 10 * 60))
+    TRANSCRIPT_CACHE_ENABLED = os.getenv("TRANSCRIPT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    TRANSCRIPT_CACHE_DIR = os.getenv("TRANSCRIPT_CACHE_DIR", os.path.join(os.getcwd(), "cache", "transcripts"))
+    TIKTOKEN_CACHE_DIR = os.getenv("TIKTOKEN_CACHE_DIR", os.path.join(os.getcwd(), "cache", "tiktoken"))
+    TRANSCRIPT_CACHE_MAX_BYTES = int(os.getenv("TRANSCRIPT_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+    MEDIA_MAX_CONCURRENCY = int(os.getenv("MEDIA_MAX_CONCURRENCY", os.cpu_count() or 1))
+    FFMPEG_THREADS_PER_JOB = int(
+        os.getenv("FFMPEG_THREADS_PER_JOB", max(1, (os.cpu_count() or 1) // MEDIA_MAX_CONCURRENCY))
+    )
     
 config = Config()
 
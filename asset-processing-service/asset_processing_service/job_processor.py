@@ -2,77 +2,201 @@
 
 import asyncio
 import os
-from asset_processing_service.api_client import fetch_asset, fetch_asset_file, update_asset_content, update_job_details, update_job_heartbeat
-from asset_processing_service.media_processor import extract_audio_and_split, split_audio_file, transcribe_chunks
-from asset_processing_service.models import AssetProcessingJob
+import time
+from typing import Optional
+from asset_processing_service.api_client import (
+    download_asset_file,
+    fetch_asset,
+    iter_asset_file,
+    update_asset_content,
+    update_asset_content_file,
+)
+from asset_processing_service.audio_encoding import segmentation_settings
+from asset_processing_service.checkpoint import JobCheckpoint
+from asset_processing_service.models import Asset, AssetProcessingJob
 from asset_processing_service.config import Config
-from asset_processing_service.logger import logger
+from asset_processing_service.job_updater import job_updater
+from asset_processing_service.logger import log_context, logger, rate_limit_filter
+from asset_processing_service.metrics import job_seconds, jobs_in_flight, jobs_total, timed_stage
+from asset_processing_service.processors import ProcessedContent, get_processor, register_processor
+from asset_processing_service.text_processor import spool_text
+from asset_processing_service.transcript_cache import transcript_cache, transcript_key
 
-async def process_job(job: AssetProcessingJob): 
+# How much of the content the final log line shows.
+CONTENT_PREVIEW_CHARS = 200
+
+
+def content_summary(content: str) -> str:
+    """Length and a short preview of content, so a long transcript never floods the log."""
+    preview = repr(content[:CONTENT_PREVIEW_CHARS])
+    if len(content) > CONTENT_PREVIEW_CHARS:
+        preview += "..."
+    return f"{len(content)} characters, {preview}"
+
+
+async def process_job(job: AssetProcessingJob, asset: Optional[Asset] = None):
+    """Run one attempt at a job, with the job id attached to everything it logs."""
+    try:
+        with log_context(job_id=job.id):
+            await run_job(job, asset)
+    finally:
+        rate_limit_filter.forget_job(job.id)
+
+
+async def run_job(job: AssetProcessingJob, asset: Optional[Asset] = None): 
     logger.info(f"Processing job: {job.id}")
-    heartbeat_task = asyncio.create_task(heartbeat_updater(job.id))
+    job_updater.track(job.id)
+    jobs_in_flight.inc()
+    started = time.perf_counter()
+    status = "failed"
     
     try:
-        await update_job_details(job.id, {"status": "in_progress"})
-        asset = await fetch_asset(job.asset_id)
+        job_updater.update(job.id, {"status": "in_progress", "attempts": job.attempts})
+        if not asset:
+            with timed_stage("fetch_asset"):
+                asset = await fetch_asset(job.asset_id)
         if not asset:
             raise ValueError(f"Asset not found for job {job.asset_id}")        
-        file_buffer = await fetch_asset_file(asset.fileUrl)
-        
-        content_type =  asset.fileType
-        
-        if content_type == ["text", "markdown"]:
-            logger.info(f"Text file detected. Reading content of {asset.fileName}")
-            content = file_buffer.decode("utf-8")
-        elif content_type == "audio":
-            logger.info("Processing audio file...")
-            chunks = await split_audio_file(
-                file_buffer,
-                Config.MAX_CHUNK_SIZE_BYTES,
-                os.path.basename(asset.fileName)
-            )
-            transcribed_chunks = await transcribe_chunks(chunks)    
-            content = "\n".join(transcribed_chunks)
-            
-        elif content_type == "video":
-            logger.info("Processing video file...")
-            chunks = await extract_audio_and_split(
-                file_buffer,
-                Config.MAX_CHUNK_SIZE_BYTES,
-                os.path.basename(asset.fileName)
-            )
-            transcribed_chunks = await transcribe_chunks(chunks)
-            content = "\n".join(transcribed_chunks)
-            
-        else:
-            raise ValueError(f"Invalid content type: {content_type}")
-        logger.info(f"Final Content: {content}")
+        processor = get_processor(asset)
+        checkpoint = await asyncio.to_thread(JobCheckpoint.load, job.id, asset.id)
+        result = await processor(asset, checkpoint)
+        if result.content is not None:
+            logger.info(f"Final content for asset {asset.id}: {content_summary(result.content)}")
     
-        await update_asset_content(asset.id, content)
-        await update_job_details(job.id, {"status": "completed"})
+        with timed_stage("upload"):
+            if result.content_path is not None:
+                token_count = await update_asset_content_file(asset.id, result.content_path, result.token_count)
+            else:
+                token_count = await update_asset_content(asset.id, result.content, result.token_count)
+        if result.cache_key is not None:
+            await transcript_cache.aput(result.cache_key, result.content, token_count)
+        job_updater.update(job.id, {"status": "completed"})
+        status = "completed"
+        await asyncio.to_thread(checkpoint.remove)
     except Exception as e:
         logger.error(f"Error processing job {job.id}: {e}")
         error_message = str(e)
-        await update_job_details(job.id, {"status": "failed", "error": error_message})
+        job_updater.update(job.id, {"status": "failed", "error": error_message, "attempts": job.attempts + 1})
         
     finally:
-        heartbeat_task.cancel()
-        try:
-            await heartbeat_task
-        except asyncio.CancelledError:
-            pass
-
-
-
-async def heartbeat_updater(job_id: str):
-    while True:
-        try:
-            await update_job_heartbeat(job_id)
-            await asyncio.sleep(Config.HEARTBEAT_INTERVAL_SECONDS)
-        except asyncio.CancelledError:
-            break
-        except Exception as e:
-            logger.error(f"Error updating heartbeat for job {job_id}: {e}")
-            break
-            
-        
\ No newline at end of file
+        job_updater.untrack(job.id)
+        jobs_in_flight.dec()
+        file_type = asset.fileType if asset else "unknown"
+        job_seconds.observe(time.perf_counter() - started, file_type=file_type, status=status)
+        jobs_total.inc(file_type=file_type, status=status)
+
+
+async def process_media(asset: Asset, checkpoint: JobCheckpoint, split_function, stream_function) -> ProcessedContent:
+    """
+        Download audio or video, then segment and transcribe it. A transcript
+        cached for the same file content skips the media work entirely.
+    """
+    from asset_processing_service.media_processor import join_transcripts
+
+    input_path = os.path.join(checkpoint.work_dir, os.path.basename(asset.fileName))
+    with timed_stage("download"):
+        asset_sha256 = await download_stage(checkpoint, asset.fileUrl, input_path)
+    asset_cache_key = transcript_key("asset", asset_sha256, segmentation_settings())
+    cached = await transcript_cache.aget(asset_cache_key)
+    if cached is not None:
+        logger.info(f"Transcript cache hit for asset {asset.id}. Skipping media processing.")
+        return ProcessedContent(content=cached["text"], token_count=cached["token_count"])
+
+    transcribed_chunks = await segment_and_transcribe_stage(checkpoint, split_function, stream_function, input_path)
+    with timed_stage("join"):
+        content, token_count = await join_transcripts(transcribed_chunks)
+    return ProcessedContent(content=content, token_count=token_count, cache_key=asset_cache_key)
+
+
+# The media stack (ffmpeg and the transcription client) is imported by the
+# first audio or video job rather than at startup.
+async def process_audio(asset: Asset, checkpoint: JobCheckpoint) -> ProcessedContent:
+    from asset_processing_service.media_processor import split_audio_file, stream_split_audio_file
+
+    logger.info("Processing audio file...")
+    return await process_media(asset, checkpoint, split_audio_file, stream_split_audio_file)
+
+
+async def process_video(asset: Asset, checkpoint: JobCheckpoint) -> ProcessedContent:
+    from asset_processing_service.media_processor import extract_audio_and_split, stream_extract_audio_and_split
+
+    logger.info("Processing video file...")
+    return await process_media(asset, checkpoint, extract_audio_and_split, stream_extract_audio_and_split)
+
+
+async def process_text(asset: Asset, checkpoint: JobCheckpoint) -> ProcessedContent:
+    """
+        Decode the text as it downloads into a UTF-8 copy in the working
+        directory and count its tokens on the way, without the media pipeline.
+    """
+    content_path = os.path.join(checkpoint.work_dir, "content.txt")
+    done = checkpoint.get("decode")
+    if done and os.path.exists(content_path) and os.path.getsize(content_path) == done["size"]:
+        logger.info(f"Reusing decoded text from a previous attempt: {content_path}")
+        return ProcessedContent(content_path=content_path, token_count=done["token_count"])
+
+    logger.info(f"Text file detected. Reading content of {asset.fileName}")
+    with timed_stage("read_text"):
+        encoding, size, token_count = await spool_text(iter_asset_file(asset.fileUrl), content_path)
+    logger.info(f"Decoded {asset.fileName} from {encoding}: {size} bytes, {token_count} tokens")
+    checkpoint.mark_done("decode", size=size, token_count=token_count, encoding=encoding)
+    return ProcessedContent(content_path=content_path, token_count=token_count)
+
+
+register_processor(process_audio, file_types=["audio"], mime_types=["audio/*"])
+register_processor(process_video, file_types=["video"], mime_types=["video/*"])
+register_processor(process_text, file_types=["text", "markdown", "text/plain", "text/markdown"], mime_types=["text/*"])
+
+
+async def download_stage(checkpoint: JobCheckpoint, file_url: str, input_path: str) -> str:
+    """Download the asset unless a previous attempt already did. Returns its SHA-256."""
+    done = checkpoint.get("download")
+    if done and os.path.exists(input_path) and os.path.getsize(input_path) == done["size"]:
+        logger.info(f"Reusing download from a previous attempt: {input_path}")
+        return done["sha256"]
+    size, sha256 = await download_asset_file(file_url, input_path)
+    checkpoint.mark_done("download", size=size, sha256=sha256)
+    return sha256
+
+
+async def segment_stage(checkpoint: JobCheckpoint, split_function, input_path: str):
+    """
+        Convert and segment the media unless a previous attempt already did.
+        Conversion happens inside the single-pass segmenting run, so one stage covers both.
+    """
+    from asset_processing_service.media_processor import stat_chunks
+
+    done = checkpoint.get("segment")
+    if done and all(os.path.exists(os.path.join(checkpoint.work_dir, f)) for f in done["chunk_files"]):
+        logger.info(f"Reusing {len(done['chunk_files'])} segments from a previous attempt.")
+        return stat_chunks(checkpoint.work_dir, done["chunk_files"], Config.MAX_CHUNK_SIZE_BYTES)
+    chunks = await split_function(input_path, Config.MAX_CHUNK_SIZE_BYTES, checkpoint.work_dir)
+    checkpoint.mark_done("segment", chunk_files=[chunk["file_name"] for chunk in chunks])
+    return chunks
+
+
+async def segment_and_transcribe_stage(checkpoint: JobCheckpoint, split_function, stream_function, input_path: str):
+    """
+        Segment the media and transcribe every chunk. With STREAMING_PIPELINE,
+        chunks are transcribed while ffmpeg is still encoding the rest, so the
+        encode and the uploads overlap. Segments left by a previous attempt
+        are transcribed directly.
+    """
+    from asset_processing_service.media_processor import transcribe_chunk_stream, transcribe_chunks
+
+    done = checkpoint.get("segment")
+    if done or not Config.STREAMING_PIPELINE:
+        with timed_stage("segment"):
+            chunks = await segment_stage(checkpoint, split_function, input_path)
+        with timed_stage("transcribe"):
+            return await transcribe_chunks(chunks, checkpoint)
+
+    async def recorded_segments():
+        chunk_files = []
+        async for chunk in stream_function(input_path, Config.MAX_CHUNK_SIZE_BYTES, checkpoint.work_dir):
+            chunk_files.append(chunk["file_name"])
+            yield chunk
+        checkpoint.mark_done("segment", chunk_files=chunk_files)
+
+    with timed_stage("segment_and_transcribe"):
+        return await transcribe_chunk_stream(recorded_segments(), checkpoint)
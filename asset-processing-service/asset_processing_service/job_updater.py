@@ -0,0 +1,153 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+from asset_processing_service.api_client import update_job_details, update_job_heartbeat
+from asset_processing_service.config import Config
+from asset_processing_service.logger import logger
+
+
+class JobUpdateBuffer:
+    """
+        Write-behind buffer for job PATCHes. Heartbeats for every running job
+        and status transitions are queued here and sent in periodic batches
+        over the pooled API client.
+
+        Updates to the same job are coalesced: a heartbeat rides along with
+        any pending update, and a repeated status replaces the previous one.
+        Distinct status transitions for a job are sent one after another in
+        the order they were queued.
+    """
+
+    def __init__(self, flush_interval_seconds: float, batch_size: int, heartbeat_interval_seconds: float):
+        self.flush_interval_seconds = flush_interval_seconds
+        self.batch_size = max(1, batch_size)
+        self.heartbeat_interval_seconds = heartbeat_interval_seconds
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        self._tracked: set = set()
+        self._sending: set = set()
+        self._last_heartbeat_at = 0.0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._running = False
+        self._task: Optional[asyncio.Task] = None
+
+    def track(self, job_id: str) -> None:
+        """Send periodic heartbeats for job_id until untrack() is called."""
+        self._tracked.add(job_id)
+        self.heartbeat(job_id)
+
+    def untrack(self, job_id: str) -> None:
+        self._tracked.discard(job_id)
+
+    def heartbeat(self, job_id: str) -> None:
+        # Every PATCH carries lastHeartBeat, so any pending update already covers it.
+        if not self._pending.get(job_id):
+            self._pending.setdefault(job_id, []).append({})
+
+    def update(self, job_id: str, update_data: Dict[str, Any]) -> None:
+        entries = self._pending.setdefault(job_id, [])
+        if entries and (
+            "status" not in entries[-1]
+            or "status" not in update_data
+            or entries[-1]["status"] == update_data["status"]
+        ):
+            entries[-1].update(update_data)
+        else:
+            entries.append(dict(update_data))
+        if len(self._pending) >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+
+    def has_pending(self, job_id: str) -> bool:
+        """True while updates for job_id are queued or being sent."""
+        return job_id in self._pending or job_id in self._sending
+
+    def pending_job_ids(self) -> set:
+        """Ids of every job with updates queued or being sent."""
+        return set(self._pending) | self._sending
+
+    def pending_count(self) -> int:
+        return sum(len(entries) for entries in self._pending.values())
+
+    async def _send(self, job_id: str, entries: List[Dict[str, Any]]) -> None:
+        self._sending.add(job_id)
+        try:
+            for entry in entries:
+                if entry:
+                    await update_job_details(job_id, entry)
+                else:
+                    await update_job_heartbeat(job_id)
+        finally:
+            self._sending.discard(job_id)
+
+    async def drain(self, job_id: str) -> None:
+        """Send job_id's queued updates now and wait until none are in flight."""
+        while self.has_pending(job_id):
+            if job_id in self._sending:
+                # Let the in-flight batch finish first so transitions stay in order.
+                await asyncio.sleep(0.05)
+                continue
+            try:
+                await self._send(job_id, self._pending.pop(job_id))
+            except Exception as e:
+                logger.error(f"Error sending updates for job {job_id}: {e}")
+                return
+
+    async def flush(self) -> None:
+        """
+            Send everything queued so far, batch_size jobs at a time. A job
+            whose earlier updates are still being sent, by drain() or a
+            previous flush, waits for them so its transitions stay in order.
+        """
+        while self._pending:
+            job_ids = [job_id for job_id in self._pending if job_id not in self._sending][: self.batch_size]
+            if not job_ids:
+                await asyncio.sleep(0.05)
+                continue
+            batch = [(job_id, self._pending.pop(job_id)) for job_id in job_ids]
+            results = await asyncio.gather(
+                *(self._send(job_id, entries) for job_id, entries in batch),
+                return_exceptions=True,
+            )
+            for (job_id, _), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Error flushing updates for job {job_id}: {result}")
+
+    def start(self) -> asyncio.Task:
+        self._wakeup = asyncio.Event()
+        self._running = True
+        self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def _run(self) -> None:
+        while self._running:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            now = time.monotonic()
+            if self._running and now - self._last_heartbeat_at >= self.heartbeat_interval_seconds:
+                self._last_heartbeat_at = now
+                for job_id in self._tracked:
+                    self.heartbeat(job_id)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Job update flush failed: {e}")
+
+    async def stop(self) -> None:
+        """Stop the flusher after delivering everything still queued."""
+        self._running = False
+        if self._task is not None:
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        # The flusher may have exited before running, or mid-flush with more queued behind it.
+        await self.flush()
+
+
+job_updater = JobUpdateBuffer(
+    Config.JOB_UPDATE_FLUSH_INTERVAL_SECONDS,
+    Config.JOB_UPDATE_BATCH_SIZE,
+    Config.HEARTBEAT_INTERVAL_SECONDS,
+)
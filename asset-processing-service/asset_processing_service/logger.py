@@ -1,15 +1,145 @@
+import atexit
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+import json
 import logging
+import logging.handlers
+import queue
 import sys
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from asset_processing_service.config import Config
+
+# Attached to every record logged while they are set. asyncio tasks inherit
+# them, so chunk tasks started inside a job log with that job's id and stage.
+job_id_var: ContextVar[Optional[str]] = ContextVar("job_id", default=None)
+stage_var: ContextVar[Optional[str]] = ContextVar("stage", default=None)
+
+
+@contextmanager
+def log_context(job_id: Optional[str] = None, stage: Optional[str] = None):
+    tokens = []
+    if job_id is not None:
+        tokens.append((job_id_var, job_id_var.set(job_id)))
+    if stage is not None:
+        tokens.append((stage_var, stage_var.set(stage)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def truncate(text: str, max_chars: int = Config.LOG_MAX_MESSAGE_CHARS) -> str:
+    if not max_chars or len(text) <= max_chars:
+        return text
+    return f"{text[:max_chars]}... [{len(text) - max_chars} more characters]"
+
+
+class ContextFilter(logging.Filter):
+    """Copies the job id and stage onto the record in the thread that logged it."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.job_id = job_id_var.get()
+        record.stage = stage_var.get()
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+        Lets through at most one record per interval for each rate_limit key
+        (passed with extra={"rate_limit": key}), per job. The next record let
+        through says how many were dropped in between. Records without a key
+        are never limited. A job's entries are dropped when it finishes, and
+        only the max_keys most recently used are kept.
+    """
+
+    def __init__(self, interval_seconds: float, max_keys: int):
+        super().__init__()
+        self.interval_seconds = interval_seconds
+        self.max_keys = max(1, max_keys)
+        self._state: "OrderedDict[Tuple[str, Optional[str]], Tuple[float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def forget_job(self, job_id: str) -> None:
+        with self._lock:
+            for state_key in [state_key for state_key in self._state if state_key[1] == job_id]:
+                del self._state[state_key]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, "rate_limit", None)
+        if key is None or self.interval_seconds <= 0:
+            return True
+        state_key = (key, getattr(record, "job_id", None))
+        now = time.monotonic()
+        with self._lock:
+            last_emitted, suppressed = self._state.get(state_key, (float("-inf"), 0))
+            if now - last_emitted < self.interval_seconds:
+                self._state[state_key] = (last_emitted, suppressed + 1)
+                return False
+            self._state[state_key] = (now, 0)
+            self._state.move_to_end(state_key)
+            while len(self._state) > self.max_keys:
+                self._state.popitem(last=False)
+        if suppressed:
+            record.msg = f"{record.getMessage()} ({suppressed} similar messages suppressed)"
+            record.args = None
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "message": truncate(record.getMessage()),
+            "job_id": getattr(record, "job_id", None),
+            "stage": getattr(record, "stage", None),
+            "process": record.processName,
+        }
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s - %(levelname)s - %(message)s')
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = truncate(super().format(record))
+        fields = " ".join(
+            f"{name}={getattr(record, name)}" for name in ("job_id", "stage") if getattr(record, name, None)
+        )
+        return f"{line} [{fields}]" if fields else line
+
+
+rate_limit_filter = RateLimitFilter(Config.LOG_RATE_LIMIT_SECONDS, Config.LOG_RATE_LIMIT_MAX_KEYS)
+
 
 def setup_logger():
+    """
+        Records go through a queue to a background thread that writes them
+        to stdout, so a slow stdout never blocks the event loop. Context and
+        rate limiting are applied before queueing, in the logging thread.
+    """
     logger = logging.getLogger(__name__)
-    logger.setLevel(logging.INFO)
-    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-    
+    logger.setLevel(Config.LOG_LEVEL)
+    logger.propagate = False
+
     console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
-    
+    console_handler.setFormatter(JsonFormatter() if Config.LOG_FORMAT == "json" else TextFormatter())
+
+    queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+    queue_handler.addFilter(ContextFilter())
+    queue_handler.addFilter(rate_limit_filter)
+    logger.addHandler(queue_handler)
+
+    listener = logging.handlers.QueueListener(queue_handler.queue, console_handler)
+    listener.start()
+    atexit.register(listener.stop)
+
     return logger
 
-logger = setup_logger()
\ No newline at end of file
+logger = setup_logger()
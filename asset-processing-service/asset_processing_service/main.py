@@ -1,77 +1,160 @@
+import argparse
 import asyncio
 from collections import defaultdict
 from datetime import datetime
 from time import sleep
-from asset_processing_service.api_client import fetch_jobs, update_job_details
+from typing import Callable, Optional
+from asset_processing_service.api_client import api_client, fetch_asset, fetch_jobs
+from asset_processing_service.autoscaler import Autoscaler, WorkerPool
+from asset_processing_service.checkpoint import remove_checkpoint, remove_stale_checkpoints
 from asset_processing_service.config import Config
 from asset_processing_service.job_processor import process_job
+from asset_processing_service.job_updater import job_updater
 from asset_processing_service.logger import logger
+from asset_processing_service.media_executor import media_executor
+from asset_processing_service.metrics import media_tasks_queued, media_tasks_running, metrics_server, queue_depth, workers
+from asset_processing_service.scheduler import JobScheduler
+from asset_processing_service.token_counter import token_counter
+from asset_processing_service.transcription import close_transcription_engine
+
+
+async def fail_stuck_jobs(jobs_pending_or_in_progress: set):
+    jobs = await fetch_jobs(statuses=["in_progress"])
+    current_time = datetime.now().timestamp()
+    for job in jobs:
+        if not job.last_heartbeat:
+            continue
+        last_heartbeat = job.last_heartbeat.timestamp()             
+        time_since_last_heartbeat = abs(current_time - last_heartbeat)  
+                  
+        if time_since_last_heartbeat > Config.STUCK_JOB_THRESHOLD_SECONDS:
+            logger.info(f"Job {job.id} is stuck ({time_since_last_heartbeat:.0f}s since last heartbeat), Failing job.")
+            job_updater.update(job.id,{                            
+                "status": "failed",
+                "error_message": "Job is stuck",
+                "attempts": job.attempts + 1
+            })
+            jobs_pending_or_in_progress.discard(job.id)
+
+
+async def wait_for_slot(slot_freed: asyncio.Event, timeout: float):
+    try:
+        await asyncio.wait_for(slot_freed.wait(), timeout=timeout)
+    except asyncio.TimeoutError:
+        pass
 
 
 async def job_fetcher(
-        job_queue: asyncio.Queue,
-        jobs_pending_or_in_progress: set):
+        job_queue: JobScheduler,
+        jobs_pending_or_in_progress: set,
+        slot_freed: asyncio.Event,
+        capacity: Callable[[], int]):
+    """
+        Acquire only as many jobs as there are free slots. capacity() covers
+        the current workers plus a small lookahead so the scheduler has jobs
+        to choose between. Backs off while there is nothing to do and wakes as
+        soon as a worker frees a slot or a new worker starts.
+
+        The API still lists jobs this node holds as created or failed until
+        their updates arrive, and lists them first. The page is widened by
+        the number of held jobs so they cannot crowd out new ones.
+    """
+    idle_delay = Config.JOB_POLL_MIN_INTERVAL_SECONDS
+    last_stuck_check = 0.0
+    last_sweep = None
 
     while True:
         try:
-            logger.info("Fetching job...")
-            jobs = await fetch_jobs()        
-            for job in jobs: # ✅ Proper async queueing            
-                current_time = datetime.now().timestamp()     
-                logger.info(f"Current time: {current_time}")
-                if job.status == "in_progress" and job.last_heartbeat:
-                    last_heartbeat = job.last_heartbeat.timestamp()             
-                    time_since_last_heartbeat = abs(current_time - last_heartbeat)  
-                    logger.info(f"Time since last heartbeat for job {job.id}: {time_since_last_heartbeat} seconds")    
-                              
-                    if time_since_last_heartbeat > Config.STUCK_JOB_THRESHOLD_SECONDS:
-                        logger.info(f"Job {job.id} is stuck, Failing job.")
-                        await update_job_details(job.id,{                            
-                            "status": "failed",
-                            "error_message": "Job is stuck",
-                            "attempts": job.attempts + 1
-                        })
-                        if job.id in jobs_pending_or_in_progress:
-                            jobs_pending_or_in_progress.remove(job.id)  # ✅ Use discard() to avoid KeyError
-                    
-                elif job.status in ["created", "failed"]:
-                    if job.attempts >= Config.MAX_JOB_ATTEMPTS:
-                        logger.info(f"Job {job.id} has exceeded max attempts, failing job.")
-                        await update_job_details(job.id, {
-                            "status": "max_attempts_exceeded",
-                            "error_message": "Max attempts exceeded",
-                            "attempts": job.attempts + 1
-                        })                    
-                    
-                    elif job.id not in jobs_pending_or_in_progress:
-                        logger.info(f"Adding job to queue: {job.id}")
-                        jobs_pending_or_in_progress.add(job.id)
-                        await job_queue.put(job)  # ✅ Async safe queueing
-                    
-            await asyncio.sleep(3)  # ✅ Correct async sleep
+            loop_time = asyncio.get_running_loop().time()
+            if loop_time - last_stuck_check >= Config.STUCK_JOB_CHECK_INTERVAL_SECONDS:
+                last_stuck_check = loop_time
+                await fail_stuck_jobs(jobs_pending_or_in_progress)
+            if last_sweep is None or loop_time - last_sweep >= Config.CHECKPOINT_SWEEP_INTERVAL_SECONDS:
+                # Work directories of jobs that failed here and then finished elsewhere.
+                last_sweep = loop_time
+                await asyncio.to_thread(
+                    remove_stale_checkpoints, Config.CHECKPOINT_MAX_AGE_SECONDS, set(jobs_pending_or_in_progress)
+                )
+
+            free_slots = capacity() - len(jobs_pending_or_in_progress)
+            if free_slots <= 0:
+                slot_freed.clear()
+                await wait_for_slot(slot_freed, Config.STUCK_JOB_CHECK_INTERVAL_SECONDS)
+                continue
+
+            held = jobs_pending_or_in_progress | job_updater.pending_job_ids()
+            limit = free_slots + len(held)
+            jobs = await fetch_jobs(statuses=["created", "failed"], limit=limit)
+            new_jobs = []
+            for job in jobs:
+                if job.id in held or job.status not in ("created", "failed"):
+                    # Jobs with unsent updates may have just finished here; wait for the API to catch up.
+                    continue
+                if job.attempts >= Config.MAX_JOB_ATTEMPTS:
+                    logger.info(f"Job {job.id} has exceeded max attempts, failing job.")
+                    job_updater.update(job.id, {
+                        "status": "max_attempts_exceeded",
+                        "error_message": "Max attempts exceeded",
+                        "attempts": job.attempts + 1
+                    })                    
+                    await asyncio.to_thread(remove_checkpoint, job.id)
+
+                elif len(new_jobs) < free_slots:
+                    jobs_pending_or_in_progress.add(job.id)
+                    new_jobs.append(job)
+
+            # The scheduler needs each asset's size, type and project to rank the job.
+            assets = await asyncio.gather(
+                *(fetch_asset(job.asset_id) for job in new_jobs), return_exceptions=True
+            )
+            for job, asset in zip(new_jobs, assets):
+                if isinstance(asset, Exception) or not asset:
+                    asset = None
+                await job_queue.put(job, asset)  # ✅ Async safe queueing
+            queued = len(new_jobs)
+            if queued:
+                logger.info(f"Queued {queued} jobs: {', '.join(job.id for job in new_jobs)}")
+
+            if queued and len(jobs) >= limit:
+                # A full page means more work may be waiting; go straight back for it.
+                idle_delay = Config.JOB_POLL_MIN_INTERVAL_SECONDS
+                continue
+            if queued:
+                idle_delay = Config.JOB_POLL_MIN_INTERVAL_SECONDS
+            else:
+                idle_delay = min(idle_delay * 2, Config.JOB_POLL_MAX_INTERVAL_SECONDS)
+            slot_freed.clear()
+            await wait_for_slot(slot_freed, idle_delay)
                     
         except Exception as e:
             logger.error(f"Job fetcher failed: {e}")
-            await asyncio.sleep(3)
+            await asyncio.sleep(Config.JOB_POLL_MIN_INTERVAL_SECONDS)
         
 
 
 async def worker(
         worker_id: int,
-        job_queue: asyncio.Queue,
+        job_queue: JobScheduler,
         jobs_pending_or_in_progress: set,
-        job_locks = defaultdict(asyncio.Lock) # hint for defaultdict
+        slot_freed: asyncio.Event,
+        job_locks = defaultdict(asyncio.Lock), # hint for defaultdict
+        pool: Optional[WorkerPool] = None
     ):    
-    while True:
+    slot_freed.set()  # A new worker is a new slot for the fetcher to fill.
+    while pool is None or not pool.should_retire(worker_id):
         try:
-            job = await job_queue.get()
+            if pool is not None:
+                pool.mark_idle(worker_id)
+            job, asset = await job_queue.get()
+            if pool is not None:
+                pool.mark_busy(worker_id)
             async with job_locks[job.id]:
                 logger.info(f"Worker {worker_id} processing job: {job.id}")
                 try:
-                    await process_job(job)
+                    await process_job(job, asset)
                 except Exception as e:
                     logger.error(f"Worker {worker_id} failed to process job {job.id}: {e}")
-                    await update_job_details(
+                    job_updater.update(
                         job.id, 
                         {
                             "status": "failed",
@@ -80,39 +163,96 @@ async def worker(
                         }
                     )
                 finally:
-                    jobs_pending_or_in_progress.remove(job.id)
+                    jobs_pending_or_in_progress.discard(job.id)
                     job_locks.pop(job.id, None)
-                
-            job_queue.task_done()
+                    job_queue.task_done(job)
+                    slot_freed.set()
                     
         except Exception as e:
             logger.error(f"Worker {worker_id} failed: {e}")
             await asyncio.sleep(3)
+    logger.info(f"Worker {worker_id} retired")
 
 
 
 
 
+async def start_services(metrics_port: int = Config.METRICS_PORT):
+    await api_client.start()
+    token_counter.start()
+    job_updater.start()
+    media_tasks_running.set_function(lambda: media_executor.stats()["running"])
+    media_tasks_queued.set_function(lambda: media_executor.stats()["queued"])
+    await metrics_server.start(metrics_port)
+
+
+async def stop_services():
+    await metrics_server.stop()
+    await job_updater.stop()
+    await api_client.close()
+    await close_transcription_engine()
+    media_executor.shutdown()
+    token_counter.shutdown()
+
+
 async def async_main():
-    job_queue = asyncio.Queue()
+    await start_services()
+    job_queue = JobScheduler(maxsize=Config.MAX_NUM_WORKERS + Config.SCHEDULER_LOOKAHEAD)
+    queue_depth.set_function(job_queue.qsize)
     jobs_pending_or_in_progress = set()
     job_locks = defaultdict(asyncio.Lock)
-    job_fetcher_task = asyncio.create_task(job_fetcher(job_queue, jobs_pending_or_in_progress))
-    
-    workers = [asyncio.create_task(
-        worker(
-            i + 1,
-            job_queue,
-            jobs_pending_or_in_progress,
-            job_locks)
-        ) 
-        for i in range(Config.MAX_NUM_WORKERS)]
+    slot_freed = asyncio.Event()
+
+    pool = WorkerPool(lambda worker_id: worker(
+        worker_id,
+        job_queue,
+        jobs_pending_or_in_progress,
+        slot_freed,
+        job_locks,
+        pool,
+    ))
+    workers.set_function(lambda: pool.size)
+    # Acquire only for the pool as it is sized now. A shrunk pool leaves jobs
+    # for other nodes, and queued jobs beyond the workers let the autoscaler
+    # see demand and grow by up to the lookahead at each step.
+    job_fetcher_task = asyncio.create_task(
+        job_fetcher(job_queue, jobs_pending_or_in_progress, slot_freed, lambda: pool.size + Config.SCHEDULER_LOOKAHEAD)
+    )
+    autoscaler_task = asyncio.create_task(Autoscaler(pool, job_queue).run())
 
-    await asyncio.gather(job_fetcher_task, *workers)
+    try:
+        await asyncio.gather(job_fetcher_task, autoscaler_task)
+    finally:
+        for task in [job_fetcher_task, autoscaler_task]:
+            task.cancel()
+        await asyncio.gather(job_fetcher_task, autoscaler_task, return_exceptions=True)
+        await pool.stop()
+        await stop_services()
 
 
 def main():
-    asyncio.run(async_main())
+    parser = argparse.ArgumentParser(description="Asset processing service")
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=Config.WORKER_PROCESSES,
+        help="Number of worker processes. Above 1, a supervisor acquires jobs and hands them to the workers.",
+    )
+    parser.add_argument(
+        "--prewarm",
+        action="store_true",
+        help="Download the tokenizer data into TIKTOKEN_CACHE_DIR and exit.",
+    )
+    args = parser.parse_args()
+
+    if args.prewarm:
+        token_counter.load()
+        logger.info(f"Tokenizer data cached in {Config.TIKTOKEN_CACHE_DIR}")
+    elif args.processes > 1:
+        from asset_processing_service.supervisor import supervisor_main
+        asyncio.run(supervisor_main(args.processes))
+    else:
+        asyncio.run(async_main())
 
 
 if __name__ == "__main__":
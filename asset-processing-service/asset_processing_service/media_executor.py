@@ -0,0 +1,80 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import time
+from typing import Any, Callable, Dict
+from asset_processing_service.config import Config
+from asset_processing_service.logger import logger
+
+
+class MediaExecutor:
+    """
+        Runs CPU-bound ffmpeg work on its own pool, sized independently of
+        MAX_NUM_WORKERS so many I/O-bound jobs can be in flight without
+        running more encodes than the machine has cores for.
+    """
+
+    def __init__(self, max_concurrency: int, threads_per_job: int):
+        self.max_concurrency = max(1, max_concurrency)
+        self.threads_per_job = max(1, threads_per_job)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix="media",
+        )
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._total_wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+            Hold a media slot for work that runs outside the pool, such as a
+            long-running ffmpeg subprocess driven from the event loop.
+        """
+        queued_at = time.monotonic()
+        self._queued += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._queued -= 1
+        waited = time.monotonic() - queued_at
+        self._total_wait_seconds += waited
+        self._max_wait_seconds = max(self._max_wait_seconds, waited)
+        if waited >= 1:
+            logger.info(f"Media task waited {waited:.2f}s for a slot. {self.stats()}", extra={"rate_limit": "media_wait"})
+
+        self._running += 1
+        try:
+            yield
+        finally:
+            self._running -= 1
+            self._completed += 1
+            self._semaphore.release()
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+            Wait for a free media slot, then run func on the media pool.
+        """
+        async with self.slot():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, lambda: func(*args, **kwargs))
+
+    def stats(self) -> Dict[str, Any]:
+        started = self._completed + self._running
+        return {
+            "max_concurrency": self.max_concurrency,
+            "running": self._running,
+            "queued": self._queued,
+            "completed": self._completed,
+            "avg_wait_seconds": round(self._total_wait_seconds / started, 3) if started else 0.0,
+            "max_wait_seconds": round(self._max_wait_seconds, 3),
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+media_executor = MediaExecutor(Config.MEDIA_MAX_CONCURRENCY, Config.FFMPEG_THREADS_PER_JOB)
@@ -1,187 +1,399 @@
 
 import asyncio
 from asyncio.log import logger
+from contextlib import aclosing
 import os
-import shutil
-import tempfile
-from typing import List
-import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from asset_processing_service.audio_encoding import choose_split_points, detect_silences, encoding_profile, profile_output_options
+from asset_processing_service.checkpoint import JobCheckpoint
 from asset_processing_service.config import Config
+from asset_processing_service.media_executor import media_executor
 import ffmpeg
-from openai import OpenAI
 from asset_processing_service.logger import logger
-async def split_audio_file(audio_buffer: bytes, max_chunk_size_bytes: int, original_file_name: str):
-    file_name_without_ext, file_extension = os.path.splitext(original_file_name)
+from asset_processing_service.metrics import stage_seconds, timed_stage, transcription_chunks_total, transcription_upload_bytes_total
+from asset_processing_service.transcription import get_transcription_engine
+from asset_processing_service.token_counter import token_counter
+from asset_processing_service.transcript_cache import sha256_file, transcript_cache, transcript_key
+
+
+def segment_duration_for(max_chunk_size_bytes: int, bitrate_kbps: int) -> float:
+    """
+        Longest segment duration (seconds) that keeps a constant-bitrate MP3
+        segment under max_chunk_size_bytes, with headroom for frame padding
+        and container overhead.
+    """
+    return max(1.0, max_chunk_size_bytes * 8 / (bitrate_kbps * 1000) * 0.95)
+
+
+def list_chunk_files(work_dir: str, chunk_prefix: str) -> List[str]:
+    return sorted(
+        [
+            f
+            for f in os.listdir(work_dir)
+            if f.startswith(chunk_prefix) and f.endswith(".mp3")
+        ]
+    )
+
+
+def remove_chunk_files(work_dir: str, chunk_prefix: str) -> None:
+    """Clear segments left behind by an interrupted attempt."""
+    for chunk_file_name in list_chunk_files(work_dir, chunk_prefix):
+        os.remove(os.path.join(work_dir, chunk_file_name))
+
+
+def stat_chunks(work_dir: str, chunk_files: List[str], max_chunk_size_bytes: int) -> List[dict]:
+    """
+        Describe segment files in the job's working directory without loading
+        them. Chunk data is only read from disk when a chunk is hashed or uploaded.
+    """
     chunks = []
-    temp_dir = tempfile.mkdtemp()
-    try:
-        temp_input_path = os.path.join(temp_dir, original_file_name)
-        with open(temp_input_path, "wb") as f:
-            f.write(audio_buffer)
-        if file_extension.lower() == ".mp3":
-            logger.info("Input audio is already in MP3 format. Skipping conversion.")
-            temp_mp3_path = temp_input_path
-        else:
-            logger.info("Converting input audio to MP3 format.")
-            temp_mp3_path = os.path.join(temp_dir, f"{file_name_without_ext}_converted.mp3")
-            await convert_audio_to_mp3(temp_input_path, temp_mp3_path)
-            
-        probe = await asyncio.to_thread(ffmpeg.probe, temp_mp3_path)
-        format_info = probe.get("format", {})
-        total_size = int(format_info.get("size", 0))
-        duration = float(format_info.get("duration", 0))
-        num_chunks = max(1, int((total_size + max_chunk_size_bytes - 1) / max_chunk_size_bytes))
-        chunk_duration = duration / num_chunks
-        
-        logger.info(f"Total size: {total_size}")
-        logger.info(f"Duration: {duration}")
-        logger.info(f"Number of chunks: {num_chunks} of {chunk_duration} seconds each")
-        
-        output_pattern = os.path.join(temp_dir, f"{file_name_without_ext}_chunk_%03d.mp3")
-        split_cmd = ffmpeg.input(temp_mp3_path).output(output_pattern, format="segment", segment_time=chunk_duration, c="copy", reset_timestamps=1)
-        await asyncio.to_thread(ffmpeg.run, split_cmd, capture_stdout=True, capture_stderr=True)
+    for chunk_file_name in chunk_files:
+        chunk_path = os.path.join(work_dir, chunk_file_name)
+        chunk_size = os.path.getsize(chunk_path)
         
-        chunk_files = sorted(
-            [
-                f
-                for f in os.listdir(temp_dir)
-                if f.startswith(f"{file_name_without_ext}_chunk_") and f.endswith(".mp3")
-            ]
-        )
-        
-        for chunk_file_name in chunk_files:
-            chunk_path = os.path.join(temp_dir, chunk_file_name)
-            with open(chunk_path, "rb") as f:
-                chunk_data = f.read()
-            chunk_size = len(chunk_data)
-            
-            if (chunk_size <= max_chunk_size_bytes):
-                chunks.append(
-                    {
-                        "data": chunk_data,
+        if (chunk_size <= max_chunk_size_bytes):
+            chunks.append(
+                {
+                    "path": chunk_path,
+                    "size": chunk_size,
+                    "file_name": chunk_file_name,
+                }
+            )
+        else:
+            logger.error(f"Chunk {chunk_file_name} exceeds the maximum chunk size after splitting..")
+            raise ValueError(f"Chunk {chunk_file_name} exceeds the maximum chunk size after splitting..")
+    return chunks
+
+
+def collect_chunks(work_dir: str, chunk_prefix: str, max_chunk_size_bytes: int) -> List[dict]:
+    return stat_chunks(work_dir, list_chunk_files(work_dir, chunk_prefix), max_chunk_size_bytes)
+
+
+async def plan_segments(
+    input_path: str,
+    max_segment_seconds: float,
+    duration: Optional[float] = None,
+    at_silences: bool = True,
+) -> Dict[str, Any]:
+    """
+        Segment muxer options for input_path. Media longer than one segment is
+        cut at detected silences, so words are not split across chunks.
+        Anything else, or a failed detection, uses fixed-length segments.
+        Detection decodes the whole input before segmenting can start, so the
+        streaming pipeline passes at_silences=False.
+    """
+    fixed = {"segment_time": max_segment_seconds}
+    if not (at_silences and Config.SILENCE_SPLIT):
+        return fixed
+    try:
+        if duration is None:
+            with timed_stage("probe"):
+                probe = await media_executor.run(ffmpeg.probe, input_path)
+            duration = float(probe.get("format", {}).get("duration", 0))
+        if duration <= max_segment_seconds:
+            return fixed
+        with timed_stage("silence_detect"):
+            silences = await media_executor.run(detect_silences, input_path)
+    except (ffmpeg.Error, OSError, ValueError) as e:
+        logger.error(f"Silence detection failed, splitting at fixed durations: {e}")
+        return fixed
+    cuts, at_silence = choose_split_points(duration, max_segment_seconds, silences)
+    logger.info(f"Splitting into {len(cuts) + 1} segments, {at_silence} of {len(cuts)} cuts at silences")
+    return {"segment_times": ",".join(f"{cut:.3f}" for cut in cuts)}
+
+
+async def encode_segments_output(input_path: str, max_chunk_size_bytes: int, work_dir: str, at_silences: bool = True, **output_options):
+    """
+        The single ffmpeg run that demuxes the first audio stream and encodes
+        it straight into size-bounded MP3 segments with the configured
+        profile. Returns the stream and the segment file prefix.
+    """
+    file_name_without_ext = os.path.splitext(os.path.basename(input_path))[0]
+    chunk_prefix = f"{file_name_without_ext}_chunk_"
+    output_pattern = os.path.join(work_dir, f"{chunk_prefix}%03d.mp3")
+    profile = encoding_profile()
+    segment_time = segment_duration_for(max_chunk_size_bytes, profile["bitrate_kbps"])
+    logger.info(f"Encoding audio with the {Config.AUDIO_PROFILE} profile into segments of up to {segment_time:.1f} seconds each")
+    segment_options = await plan_segments(input_path, segment_time, at_silences=at_silences)
+    remove_chunk_files(work_dir, chunk_prefix)
+    
+    stream = ffmpeg.input(input_path).output(
+        output_pattern,
+        map="0:a:0",
+        format="segment",
+        reset_timestamps=1,
+        threads=media_executor.threads_per_job,
+        **profile_output_options(profile),
+        **segment_options,
+        **output_options,
+    )
+    return stream, chunk_prefix
+
+
+async def copy_segments_output(input_path: str, max_chunk_size_bytes: int, work_dir: str, at_silences: bool = True, **output_options):
+    """Split an MP3 into size-bounded segments without re-encoding it."""
+    file_name_without_ext = os.path.splitext(os.path.basename(input_path))[0]
+    with timed_stage("probe"):
+        probe = await media_executor.run(ffmpeg.probe, input_path)
+    format_info = probe.get("format", {})
+    total_size = int(format_info.get("size", 0))
+    duration = float(format_info.get("duration", 0))
+    num_chunks = max(1, int((total_size + max_chunk_size_bytes - 1) / max_chunk_size_bytes))
+    chunk_duration = duration / num_chunks
+    
+    logger.info(f"Total size: {total_size}")
+    logger.info(f"Duration: {duration}")
+    logger.info(f"Number of chunks: {num_chunks} of {chunk_duration} seconds each")
+    segment_options = {"segment_time": chunk_duration}
+    if num_chunks > 1:
+        # Any segment up to the size limit will do, so silences can be picked within it.
+        max_segment_seconds = duration * max_chunk_size_bytes * 0.95 / total_size
+        segment_options = await plan_segments(input_path, max_segment_seconds, duration, at_silences=at_silences)
+    
+    chunk_prefix = f"{file_name_without_ext}_chunk_"
+    output_pattern = os.path.join(work_dir, f"{chunk_prefix}%03d.mp3")
+    remove_chunk_files(work_dir, chunk_prefix)
+    stream = ffmpeg.input(input_path).output(
+        output_pattern,
+        format="segment",
+        c="copy",
+        reset_timestamps=1,
+        **segment_options,
+        **output_options,
+    )
+    return stream, chunk_prefix
+
+
+async def stream_segments(stream, work_dir: str, max_chunk_size_bytes: int, stage: str) -> AsyncIterator[dict]:
+    """
+        Run a segmenting ffmpeg command as a subprocess and yield each segment
+        as soon as ffmpeg closes it. ffmpeg reports finished segments through
+        its segment list, which is written to stdout.
+    """
+    args = stream.global_args("-hide_banner", "-nostats", "-loglevel", "error").compile(overwrite_output=True)
+    async with media_executor.slot():
+        with stage_seconds.time(stage=stage):
+            process = await asyncio.create_subprocess_exec(
+                *args,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            stderr_task = asyncio.create_task(process.stderr.read())
+            try:
+                async for line in process.stdout:
+                    chunk_file_name = os.path.basename(line.decode().strip())
+                    if not chunk_file_name:
+                        continue
+                    chunk_path = os.path.join(work_dir, chunk_file_name)
+                    chunk_size = os.path.getsize(chunk_path)
+                    if chunk_size > max_chunk_size_bytes:
+                        raise ValueError(f"Chunk {chunk_file_name} exceeds the maximum chunk size after splitting..")
+                    yield {
+                        "path": chunk_path,
                         "size": chunk_size,
                         "file_name": chunk_file_name,
                     }
-                )
-            else:
-                logger.error(f"Chunk {chunk_file_name} exceeds the maximum chunk size after splitting..")
-                raise ValueError(f"Chunk {chunk_file_name} exceeds the maximum chunk size after splitting..")
-        return chunks
-                
-        
+                returncode = await process.wait()
+                stderr = await stderr_task
+                if returncode != 0:
+                    raise ffmpeg.Error(args[0], None, stderr)
+            finally:
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
+                if not stderr_task.done():
+                    stderr_task.cancel()
+
+
+def segment_list_options() -> dict:
+    return {"segment_list": "pipe:1", "segment_list_type": "flat"}
+
+
+async def stream_split_audio_file(input_path: str, max_chunk_size_bytes: int, work_dir: str) -> AsyncIterator[dict]:
+    """Streaming form of split_audio_file: yields segments while ffmpeg is still writing the rest."""
+    try:
+        if os.path.splitext(input_path)[1].lower() != ".mp3":
+            logger.info("Encoding input audio to MP3 segments.")
+            stream, _ = await encode_segments_output(
+                input_path, max_chunk_size_bytes, work_dir, at_silences=False, **segment_list_options()
+            )
+            stage = "encode"
+        else:
+            logger.info("Input audio is already in MP3 format. Skipping conversion.")
+            stream, _ = await copy_segments_output(
+                input_path, max_chunk_size_bytes, work_dir, at_silences=False, **segment_list_options()
+            )
+            stage = "split_copy"
+        async with aclosing(stream_segments(stream, work_dir, max_chunk_size_bytes, stage)) as segments:
+            async for chunk in segments:
+                yield chunk
     except Exception as e:
         logger.error(f"Error splitting audio file: {e}")
         raise e
-    finally:
-        # Clean up temp files
-        shutil.rmtree(temp_dir)
-    
-    
-async def convert_audio_to_mp3(input_path: str, output_path: str):
-    """
-        Convert audio file to MP3 format using ffmpeg.
-    """
+
+
+async def stream_extract_audio_and_split(input_path: str, max_chunk_size_bytes: int, work_dir: str) -> AsyncIterator[dict]:
+    """Streaming form of extract_audio_and_split."""
     try:
-        conversion_cmd = ffmpeg.input(input_path).output(
-            output_path,
-            format="mp3",
-            acodec="libmp3lame",
-            q=0,
+        stream, _ = await encode_segments_output(
+            input_path, max_chunk_size_bytes, work_dir, at_silences=False, **segment_list_options()
         )
-        await asyncio.to_thread(
-            ffmpeg.run,
-            conversion_cmd,
-            capture_stdout=True,
-            capture_stderr=True,
-        )
-        mp3_file_size = os.path.getsize(output_path)
-        logger.info(f"Successfully converted audio to MP3. File size: {mp3_file_size} bytes")
+        async with aclosing(stream_segments(stream, work_dir, max_chunk_size_bytes, "encode")) as segments:
+            async for chunk in segments:
+                yield chunk
     except Exception as e:
-        logger.error(f"Error converting audio to MP3: {e}")
+        logger.error(f"Error extracting audio and splitting video: {e}")
         raise e
 
 
-async def extract_audio_and_split(video_buffer: bytes, max_chunk_size_bytes: int, original_file_name: str):
-    temp_dir = os.path.join(os.getcwd(), "temp", str(uuid.uuid4()))
-    os.makedirs(temp_dir, exist_ok=True)
-    
-    base_file_name = os.path.basename(original_file_name)
-    input_file = os.path.join(temp_dir, base_file_name)
-    file_name_without_ext = os.path.splitext(base_file_name)[0]
-    output_mp3 = os.path.join(temp_dir, f"{file_name_without_ext}.mp3")
-    
-    try:
-        with open(input_file, "wb") as f:
-            f.write(video_buffer)
-            
-        stream = ffmpeg.input(input_file)
-        stream = ffmpeg.output(stream, output_mp3, acodec="libmp3lame", q=0, map="a")
-        
-        await asyncio.to_thread(
+async def encode_audio_segments(input_path: str, max_chunk_size_bytes: int, work_dir: str) -> List[dict]:
+    """
+        Demux the first audio stream and encode it straight into size-bounded
+        MP3 segments with a single ffmpeg run.
+    """
+    stream, chunk_prefix = await encode_segments_output(input_path, max_chunk_size_bytes, work_dir)
+    with timed_stage("encode"):
+        await media_executor.run(
             ffmpeg.run,
             stream,
             capture_stdout=True,
             capture_stderr=True,
+            overwrite_output=True,
         )
-        with open(output_mp3, "rb") as f:
-            mp3_buffer = f.read()
-        chunks = await split_audio_file(mp3_buffer, max_chunk_size_bytes, f"{file_name_without_ext}.mp3")
-        return chunks
+    return collect_chunks(work_dir, chunk_prefix, max_chunk_size_bytes)
+
+
+async def split_audio_file(input_path: str, max_chunk_size_bytes: int, work_dir: str):
+    file_extension = os.path.splitext(input_path)[1]
+    try:
+        if file_extension.lower() != ".mp3":
+            logger.info("Encoding input audio to MP3 segments.")
+            return await encode_audio_segments(input_path, max_chunk_size_bytes, work_dir)
+        
+        logger.info("Input audio is already in MP3 format. Skipping conversion.")
+        split_cmd, chunk_prefix = await copy_segments_output(input_path, max_chunk_size_bytes, work_dir)
+        with timed_stage("split_copy"):
+            await media_executor.run(ffmpeg.run, split_cmd, capture_stdout=True, capture_stderr=True, overwrite_output=True)
+        
+        return collect_chunks(work_dir, chunk_prefix, max_chunk_size_bytes)
         
+    except Exception as e:
+        logger.error(f"Error splitting audio file: {e}")
+        raise e
+    
+    
+async def extract_audio_and_split(input_path: str, max_chunk_size_bytes: int, work_dir: str):
+    try:
+        return await encode_audio_segments(input_path, max_chunk_size_bytes, work_dir)
     except Exception as e:
         logger.error(f"Error extracting audio and splitting video: {e}")
         raise e
-    finally:
-        # Clean up temp files
-        shutil.rmtree(temp_dir)
         
         
 """
 {
-    "data": chunk_data,
+    "path": chunk_path,
     "size": chunk_size,
     "file_name": chunk_file_name,
 }
 """
         
         
-async def transcribe_chunks(chunks: List[dict]) -> List[str]:
-    """
-        Transcribe audio chunks using OpenAI API.
-    """
-    async def transcribe_chunk(index: int, chunk: dict) -> dict:
-        try:
-            logger.info(f"Transcribing chunk {index}: {chunk['file_name']}")
-            temp_file_path = os.path.join(os.getcwd(), "temp", chunk["file_name"])
-            os.makedirs(os.path.dirname(temp_file_path), exist_ok=True)
-            
-            with open(temp_file_path, "wb") as f:
-                f.write(chunk["data"])
-            logger.info(f"Chunk {index} written to temporary file: {temp_file_path}")
-            
-            with open(temp_file_path, "rb") as audio_file:
-                client = OpenAI(api_key=Config.OPENAI_API_KEY)
-                transcription = client.audio.transcriptions.create(
-                    model=Config.OPENAI_MODEL, file=audio_file
-                )
-                logger.info(f"Transcription for chunk {index}: {transcription.text}")
-            if os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
+async def transcribe_chunk(index: int, chunk: dict, checkpoint: Optional[JobCheckpoint] = None) -> dict:
+    """
+        Transcribe one audio chunk through the shared transcription engine.
+        A chunk already recorded in the job checkpoint is not sent again, as
+        long as the segment at that index has the same content; a retry may
+        have cut the media differently. Tokens are counted as soon as the
+        transcript arrives.
+    """
+    try:
+        chunk_sha256 = await asyncio.to_thread(sha256_file, chunk["path"])
+        saved = checkpoint.chunk_transcript(index, chunk_sha256) if checkpoint is not None else None
+        if saved is not None:
+            logger.info(f"Chunk {index} already transcribed in a previous attempt.", extra={"rate_limit": "chunk"})
             return {
                 "index": index,
-                "content": transcription.text,
-            }              
-                    
-        except Exception as e:
-            logger.error(f"Error transcribing chunk {index}: {e}")
-            raise e
-    
+                "content": saved["text"],
+                "token_count": saved["token_count"],
+            }
+        
+        cache_key = transcript_key("chunk", chunk_sha256)
+        cached = await transcript_cache.aget(cache_key)
+        if cached is not None:
+            logger.info(f"Transcript cache hit for chunk {index}: {chunk['file_name']}", extra={"rate_limit": "chunk"})
+            text = cached["text"]
+            token_count = cached["token_count"]
+        else:
+            logger.info(f"Transcribing chunk {index}: {chunk['file_name']}", extra={"rate_limit": "chunk"})
+            with timed_stage("transcribe_chunk"):
+                text = await get_transcription_engine().transcribe(chunk["path"])
+            transcription_chunks_total.inc()
+            transcription_upload_bytes_total.inc(chunk["size"])
+            logger.info(f"Transcribed chunk {index}: {len(text)} characters", extra={"rate_limit": "chunk"})
+            token_count = None
+        
+        if token_count is None:
+            with timed_stage("count_tokens"):
+                token_count = await token_counter.count(text)
+            await transcript_cache.aput(cache_key, text, token_count)
+        if checkpoint is not None:
+            await checkpoint.save_chunk_transcript(index, chunk_sha256, text, token_count)
+        return {
+            "index": index,
+            "content": text,
+            "token_count": token_count,
+        }              
+                
+    except Exception as e:
+        logger.error(f"Error transcribing chunk {index}: {e}")
+        raise e
+
+
+async def transcribe_chunks(chunks: List[dict], checkpoint: Optional[JobCheckpoint] = None) -> List[dict]:
+    """
+        Transcribe all audio chunks concurrently and return them in index order.
+    """
     logger.info(f"Starting transcription of audio chunks...")
-    tasks = [transcribe_chunk(index, chunk) for index, chunk in enumerate(chunks)]
+    tasks = [transcribe_chunk(index, chunk, checkpoint) for index, chunk in enumerate(chunks)]
     transcribed_chunks = await asyncio.gather(*tasks)
     logger.info(f"Transcription complete.")
     transcribed_chunks.sort(key=lambda x: x["index"])
-    
-    transcribed_texts = [chunk["content"] for chunk in transcribed_chunks]
-    logger.info(f"Transcribed content extracted from transcribed chunks.")
-    return transcribed_texts
+    return transcribed_chunks
+
+
+async def transcribe_chunk_stream(chunks: AsyncIterator[dict], checkpoint: Optional[JobCheckpoint] = None) -> List[dict]:
+    """
+        Start transcribing each chunk as soon as it is produced, while the
+        rest are still being segmented. Results come back in index order.
+        The first failed chunk stops segmentation early.
+    """
+    logger.info(f"Starting streaming transcription of audio chunks...")
+    tasks: List[asyncio.Task] = []
+    try:
+        async with aclosing(chunks) as segments:
+            async for chunk in segments:
+                tasks.append(asyncio.create_task(transcribe_chunk(len(tasks), chunk, checkpoint)))
+                if any(task.done() and not task.cancelled() and task.exception() for task in tasks):
+                    break
+        transcribed_chunks = await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    logger.info(f"Transcription of {len(transcribed_chunks)} chunks complete.")
+    transcribed_chunks.sort(key=lambda x: x["index"])
+    return transcribed_chunks
+
+
+async def join_transcripts(transcribed_chunks: List[dict]) -> Tuple[str, int]:
+    """
+        Join chunk transcripts in index order. The token count is built from
+        the per-chunk counts, so the full transcript is never re-encoded.
+    """
+    texts = [chunk["content"] for chunk in transcribed_chunks]
+    token_count = await token_counter.count_joined(
+        texts, [chunk["token_count"] for chunk in transcribed_chunks], separator="\n"
+    )
+    return "\n".join(texts), token_count
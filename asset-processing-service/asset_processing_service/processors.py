@@ -0,0 +1,54 @@
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Iterable, Optional, TypeVar
+from asset_processing_service.checkpoint import JobCheckpoint
+from asset_processing_service.models import Asset
+
+
+@dataclass
+class ProcessedContent:
+    """
+        What a processor produced for an asset. Content is either held in
+        memory or spooled to content_path in the job's working directory.
+        A cache_key is set when the result belongs in the transcript cache.
+    """
+    content: Optional[str] = None
+    content_path: Optional[str] = None
+    token_count: Optional[int] = None
+    cache_key: Optional[str] = None
+
+
+Processor = Callable[[Asset, JobCheckpoint], Awaitable[ProcessedContent]]
+T = TypeVar("T")
+
+# Exact fileType values first, then the MIME type, then "<type>/*" wildcards.
+_processors_by_file_type: Dict[str, Processor] = {}
+_processors_by_mime_type: Dict[str, Processor] = {}
+
+
+def register_processor(processor: Processor, file_types: Iterable[str] = (), mime_types: Iterable[str] = ()) -> None:
+    for file_type in file_types:
+        _processors_by_file_type[file_type.lower()] = processor
+    for mime_type in mime_types:
+        _processors_by_mime_type[mime_type.lower()] = processor
+
+
+def match_asset_type(asset: Asset, by_file_type: Dict[str, T], by_mime_type: Dict[str, T]) -> Optional[T]:
+    """
+        Look an asset up by its fileType, then its MIME type, then the
+        MIME type's "<type>/*" wildcard. Keys must be lower case.
+    """
+    value = by_file_type.get(asset.fileType.lower())
+    if value is not None:
+        return value
+    mime_type = asset.mimeType.split(";")[0].strip().lower()
+    value = by_mime_type.get(mime_type)
+    if value is None:
+        value = by_mime_type.get(f"{mime_type.split('/')[0]}/*")
+    return value
+
+
+def get_processor(asset: Asset) -> Processor:
+    processor = match_asset_type(asset, _processors_by_file_type, _processors_by_mime_type)
+    if processor is None:
+        raise ValueError(f"Invalid content type: {asset.fileType} ({asset.mimeType})")
+    return processor
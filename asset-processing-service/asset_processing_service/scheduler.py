@@ -0,0 +1,154 @@
+import asyncio
+from collections import Counter
+from dataclasses import dataclass, field
+import itertools
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from asset_processing_service.config import Config
+from asset_processing_service.models import Asset, AssetProcessingJob
+from asset_processing_service.processors import match_asset_type
+
+# Rough processing cost, in seconds per MB, for each asset type. Matched
+# like the processor registry: fileType, then MIME type, then "<type>/*".
+COST_SECONDS_PER_MB = {
+    "video": 1.0,
+    "audio": 1.5,
+    "text": 0.02,
+    "markdown": 0.02,
+    "text/plain": 0.02,
+    "text/markdown": 0.02,
+}
+COST_SECONDS_PER_MB_BY_MIME_TYPE = {
+    "video/*": 1.0,
+    "audio/*": 1.5,
+    "text/*": 0.02,
+}
+DEFAULT_COST_SECONDS_PER_MB = 1.0
+BASE_COST_SECONDS = 1.0
+
+
+def estimate_cost_seconds(asset: Optional[Asset]) -> float:
+    if not asset:
+        return BASE_COST_SECONDS
+    per_mb = match_asset_type(asset, COST_SECONDS_PER_MB, COST_SECONDS_PER_MB_BY_MIME_TYPE)
+    if per_mb is None:
+        per_mb = DEFAULT_COST_SECONDS_PER_MB
+    return BASE_COST_SECONDS + per_mb * asset.size / (1024 * 1024)
+
+
+@dataclass
+class _Entry:
+    job: AssetProcessingJob
+    asset: Optional[Asset]
+    cost: float
+    enqueued_at: float
+    sequence: int
+    project_id: Optional[str] = field(default=None)
+
+
+class JobScheduler:
+    """
+        Drop-in replacement for the worker asyncio.Queue that hands out the
+        cheapest job first instead of the oldest.
+
+        A job's priority is its estimated cost, inflated by how many jobs
+        from the same project are already running (fair share) and reduced
+        by aging_weight for every second it has waited. Anything that has
+        waited longer than max_wait_seconds goes first regardless, so large
+        jobs are never starved.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 0,
+        aging_weight: float = Config.SCHEDULER_AGING_WEIGHT,
+        max_wait_seconds: float = Config.SCHEDULER_MAX_WAIT_SECONDS,
+        fair_share_weight: float = Config.SCHEDULER_FAIR_SHARE_WEIGHT,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.maxsize = maxsize
+        self.aging_weight = aging_weight
+        self.max_wait_seconds = max_wait_seconds
+        self.fair_share_weight = fair_share_weight
+        self._clock = clock
+        self._entries: List[_Entry] = []
+        self._running_by_project: Counter = Counter()
+        self._project_by_job: Dict[str, Optional[str]] = {}
+        self._sequence = itertools.count()
+        self._changed: Optional[asyncio.Condition] = None
+
+    def _condition(self) -> asyncio.Condition:
+        if self._changed is None:
+            self._changed = asyncio.Condition()
+        return self._changed
+
+    def qsize(self) -> int:
+        return len(self._entries)
+
+    def empty(self) -> bool:
+        return not self._entries
+
+    def full(self) -> bool:
+        return 0 < self.maxsize <= len(self._entries)
+
+    def _priority(self, entry: _Entry, now: float) -> Tuple[int, float, int]:
+        waited = now - entry.enqueued_at
+        if waited >= self.max_wait_seconds:
+            return (0, entry.enqueued_at, entry.sequence)
+        fair_share = 1 + self.fair_share_weight * self._running_by_project[entry.project_id]
+        score = entry.cost * fair_share - self.aging_weight * waited
+        return (1, score, entry.sequence)
+
+    def put_nowait(self, job: AssetProcessingJob, asset: Optional[Asset] = None) -> None:
+        if self.full():
+            raise asyncio.QueueFull
+        self._entries.append(
+            _Entry(
+                job=job,
+                asset=asset,
+                cost=estimate_cost_seconds(asset),
+                enqueued_at=self._clock(),
+                sequence=next(self._sequence),
+                project_id=asset.projectId if asset else None,
+            )
+        )
+
+    async def put(self, job: AssetProcessingJob, asset: Optional[Asset] = None) -> None:
+        changed = self._condition()
+        async with changed:
+            await changed.wait_for(lambda: not self.full())
+            self.put_nowait(job, asset)
+            changed.notify_all()
+
+    def get_nowait(self) -> Tuple[AssetProcessingJob, Optional[Asset]]:
+        if not self._entries:
+            raise asyncio.QueueEmpty
+        now = self._clock()
+        entry = min(self._entries, key=lambda e: self._priority(e, now))
+        self._entries.remove(entry)
+        self._running_by_project[entry.project_id] += 1
+        self._project_by_job[entry.job.id] = entry.project_id
+        return entry.job, entry.asset
+
+    async def get(self) -> Tuple[AssetProcessingJob, Optional[Asset]]:
+        changed = self._condition()
+        async with changed:
+            await changed.wait_for(lambda: bool(self._entries))
+            item = self.get_nowait()
+            changed.notify_all()
+            return item
+
+    def task_done(self, job: AssetProcessingJob) -> None:
+        """Release the fair-share slot held by a job returned from get()."""
+        if job.id not in self._project_by_job:
+            return
+        project_id = self._project_by_job.pop(job.id)
+        self._running_by_project[project_id] -= 1
+        if self._running_by_project[project_id] <= 0:
+            del self._running_by_project[project_id]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": len(self._entries),
+            "running_by_project": dict(self._running_by_project),
+        }
@@ -0,0 +1,268 @@
+import asyncio
+import multiprocessing
+import queue
+from typing import Dict, List, Optional, Tuple
+from asset_processing_service.api_client import api_client
+from asset_processing_service.config import Config
+from asset_processing_service.job_processor import process_job
+from asset_processing_service.job_updater import job_updater
+from asset_processing_service.logger import logger
+from asset_processing_service.main import job_fetcher, start_services, stop_services
+from asset_processing_service.metrics import jobs_in_flight, metrics_server, queue_depth
+from asset_processing_service.models import Asset, AssetProcessingJob
+from asset_processing_service.scheduler import JobScheduler
+
+# Spawned, not forked, so children never inherit the supervisor's event loop or sockets.
+mp_context = multiprocessing.get_context("spawn")
+
+
+class WorkerProcess:
+    """
+        One worker process and the jobs the supervisor has handed to it.
+        Every job id lives in exactly one assigned dict until the worker
+        reports it done or the process dies.
+    """
+
+    def __init__(self, index: int, result_queue):
+        self.index = index
+        self.result_queue = result_queue
+        self.task_queue = None
+        self.process = None
+        self.assigned: Dict[str, Tuple[AssetProcessingJob, Optional[Asset]]] = {}
+
+    def start(self) -> None:
+        self.task_queue = mp_context.Queue()
+        self.process = mp_context.Process(
+            target=run_worker_process,
+            args=(self.index, self.task_queue, self.result_queue),
+            name=f"asset-worker-{self.index}",
+            daemon=False,
+        )
+        self.process.start()
+        logger.info(f"Started worker process {self.index} (pid {self.process.pid})")
+
+    def free_slots(self) -> int:
+        return Config.MAX_NUM_WORKERS - len(self.assigned)
+
+    def assign(self, job: AssetProcessingJob, asset: Optional[Asset]) -> None:
+        self.assigned[job.id] = (job, asset)
+        self.task_queue.put((job, asset))
+
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+
+def run_worker_process(index: int, task_queue, result_queue) -> None:
+    try:
+        asyncio.run(worker_process_main(index, task_queue, result_queue))
+    except KeyboardInterrupt:
+        pass
+
+
+async def worker_process_main(index: int, task_queue, result_queue):
+    """
+        Runs jobs handed over by the supervisor. A job is reported done only
+        after its final status has reached the API, so the supervisor never
+        re-acquires a job whose update is still in this process.
+    """
+    # Each worker process serves its own metrics on the port after the supervisor's.
+    await start_services(Config.METRICS_PORT + 1 + index if Config.METRICS_PORT else 0)
+    running = set()
+
+    async def run(job: AssetProcessingJob, asset: Optional[Asset]):
+        logger.info(f"Worker process {index} processing job: {job.id}")
+        try:
+            await process_job(job, asset)
+        except Exception as e:
+            logger.error(f"Worker process {index} failed to process job {job.id}: {e}")
+            job_updater.update(
+                job.id,
+                {
+                    "status": "failed",
+                    "error_message": str(e),
+                    "attempts": job.attempts + 1
+                }
+            )
+        finally:
+            await job_updater.drain(job.id)
+            result_queue.put(("done", index, job.id))
+
+    try:
+        while True:
+            try:
+                item = await asyncio.to_thread(task_queue.get, True, 1)
+            except queue.Empty:
+                continue
+            if item is None:
+                break
+            task = asyncio.create_task(run(*item))
+            running.add(task)
+            task.add_done_callback(running.discard)
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+    finally:
+        await stop_services()
+
+
+def release_jobs(
+        worker_process: WorkerProcess,
+        job_queue: JobScheduler,
+        jobs_pending_or_in_progress: set,
+        slot_freed: asyncio.Event,
+        error_message: str):
+    for job_id, (job, _) in list(worker_process.assigned.items()):
+        logger.info(f"Releasing job {job_id} from worker process {worker_process.index}: {error_message}")
+        job_updater.update(job_id, {
+            "status": "failed",
+            "error_message": error_message,
+            "attempts": job.attempts + 1
+        })
+        job_queue.task_done(job)
+        jobs_pending_or_in_progress.discard(job_id)
+    worker_process.assigned.clear()
+    slot_freed.set()
+
+
+async def dispatcher(job_queue: JobScheduler, worker_processes: List[WorkerProcess], process_freed: asyncio.Event):
+    """Hand the scheduler's next job to the least busy worker process with a free slot."""
+
+    def least_busy() -> Optional[WorkerProcess]:
+        candidates = [w for w in worker_processes if w.is_alive() and w.free_slots() > 0]
+        return max(candidates, key=lambda w: w.free_slots(), default=None)
+
+    while True:
+        if least_busy() is None:
+            process_freed.clear()
+            try:
+                await asyncio.wait_for(process_freed.wait(), timeout=1)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        job, asset = await job_queue.get()
+        worker_process = least_busy()
+        while worker_process is None:
+            await asyncio.sleep(0.1)
+            worker_process = least_busy()
+        logger.info(f"Dispatching job {job.id} to worker process {worker_process.index}")
+        worker_process.assign(job, asset)
+
+
+async def result_reader(
+        result_queue,
+        worker_processes: List[WorkerProcess],
+        job_queue: JobScheduler,
+        jobs_pending_or_in_progress: set,
+        slot_freed: asyncio.Event,
+        process_freed: asyncio.Event):
+    while True:
+        try:
+            _, index, job_id = await asyncio.to_thread(result_queue.get, True, 1)
+        except queue.Empty:
+            continue
+        assignment = worker_processes[index].assigned.pop(job_id, None)
+        if assignment is None:
+            # Already released after the process was restarted.
+            continue
+        job_queue.task_done(assignment[0])
+        jobs_pending_or_in_progress.discard(job_id)
+        slot_freed.set()
+        process_freed.set()
+
+
+async def monitor(
+        worker_processes: List[WorkerProcess],
+        job_queue: JobScheduler,
+        jobs_pending_or_in_progress: set,
+        slot_freed: asyncio.Event,
+        process_freed: asyncio.Event):
+    """Restart worker processes that exit and release the jobs they held."""
+    while True:
+        await asyncio.sleep(1)
+        for worker_process in worker_processes:
+            if worker_process.is_alive():
+                continue
+            exitcode = worker_process.process.exitcode
+            logger.error(f"Worker process {worker_process.index} exited with code {exitcode}. Restarting.")
+            release_jobs(
+                worker_process,
+                job_queue,
+                jobs_pending_or_in_progress,
+                slot_freed,
+                f"Worker process exited with code {exitcode}",
+            )
+            worker_process.start()
+            process_freed.set()
+
+
+async def supervisor_main(num_processes: int):
+    """
+        Acquire jobs in this process and run them in num_processes worker
+        processes, each with MAX_NUM_WORKERS concurrent jobs.
+    """
+    await api_client.start()
+    job_updater.start()
+    await metrics_server.start(Config.METRICS_PORT)
+
+    result_queue = mp_context.Queue()
+    worker_processes = [WorkerProcess(i, result_queue) for i in range(num_processes)]
+    for worker_process in worker_processes:
+        worker_process.start()
+
+    capacity = num_processes * Config.MAX_NUM_WORKERS + Config.SCHEDULER_LOOKAHEAD
+    job_queue = JobScheduler(maxsize=capacity)
+    queue_depth.set_function(job_queue.qsize)
+    jobs_in_flight.set_function(lambda: sum(len(w.assigned) for w in worker_processes))
+    jobs_pending_or_in_progress = set()
+    slot_freed = asyncio.Event()
+    process_freed = asyncio.Event()
+
+    tasks = [
+        asyncio.create_task(job_fetcher(job_queue, jobs_pending_or_in_progress, slot_freed, lambda: capacity)),
+        asyncio.create_task(dispatcher(job_queue, worker_processes, process_freed)),
+        asyncio.create_task(result_reader(
+            result_queue, worker_processes, job_queue, jobs_pending_or_in_progress, slot_freed, process_freed
+        )),
+        asyncio.create_task(monitor(
+            worker_processes, job_queue, jobs_pending_or_in_progress, slot_freed, process_freed
+        )),
+    ]
+
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.to_thread(shutdown_worker_processes, worker_processes)
+        await asyncio.to_thread(collect_results, result_queue, worker_processes)
+        for worker_process in worker_processes:
+            if worker_process.assigned:
+                release_jobs(
+                    worker_process, job_queue, jobs_pending_or_in_progress, slot_freed, "Worker process stopped"
+                )
+        await metrics_server.stop()
+        await job_updater.stop()
+        await api_client.close()
+
+
+def shutdown_worker_processes(worker_processes: List[WorkerProcess]) -> None:
+    """Let each worker finish its current jobs, then terminate any that overrun the timeout."""
+    for worker_process in worker_processes:
+        if worker_process.is_alive():
+            worker_process.task_queue.put(None)
+    for worker_process in worker_processes:
+        worker_process.process.join(Config.WORKER_SHUTDOWN_TIMEOUT_SECONDS)
+        if worker_process.process.is_alive():
+            logger.error(f"Worker process {worker_process.index} did not stop in time. Terminating.")
+            worker_process.process.terminate()
+            worker_process.process.join()
+
+
+def collect_results(result_queue, worker_processes: List[WorkerProcess]) -> None:
+    """Pick up jobs reported done while the supervisor was shutting down."""
+    while True:
+        try:
+            _, index, job_id = result_queue.get(True, 0.1)
+        except queue.Empty:
+            return
+        worker_processes[index].assigned.pop(job_id, None)
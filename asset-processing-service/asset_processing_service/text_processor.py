@@ -0,0 +1,84 @@
+import asyncio
+import codecs
+import io
+from typing import AsyncIterator, Tuple
+from asset_processing_service.config import Config
+from asset_processing_service.logger import logger
+from asset_processing_service.token_counter import TokenTally, token_counter
+
+# Longest marks first: the UTF-32 LE mark starts with the UTF-16 LE one.
+BYTE_ORDER_MARKS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+def detect_encoding(sample: bytes, complete: bool) -> str:
+    """
+        Encoding of a text file from its first bytes: a byte order mark, then
+        UTF-8 if the sample is valid UTF-8, then charset_normalizer's guess
+        when it is installed, then TEXT_FALLBACK_ENCODING. A sample cut off
+        mid-character still counts as valid UTF-8 unless complete is set.
+    """
+    for mark, encoding in BYTE_ORDER_MARKS:
+        if sample.startswith(mark):
+            return encoding
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=complete)
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+    try:
+        import charset_normalizer
+    except ImportError:
+        return Config.TEXT_FALLBACK_ENCODING
+    best = charset_normalizer.from_bytes(sample).best()
+    return best.encoding if best is not None else Config.TEXT_FALLBACK_ENCODING
+
+
+def _write(f, text: str) -> int:
+    return f.write(text.encode("utf-8"))
+
+
+async def spool_text(chunks: AsyncIterator[bytes], content_path: str) -> Tuple[str, int, int]:
+    """
+        Decode a text file as it downloads and write it to content_path as
+        UTF-8, counting tokens along the way. Newlines are normalised to \\n.
+        Only one download chunk and the detection sample are held in memory.
+        Returns the detected encoding, the bytes written and the token count.
+    """
+    sample = b""
+    decoder = None
+    encoding = None
+    tally = TokenTally(token_counter)
+    bytes_written = 0
+
+    def start_decoder(complete: bool):
+        nonlocal encoding
+        encoding = detect_encoding(sample, complete)
+        logger.info(f"Decoding text as {encoding}")
+        return io.IncrementalNewlineDecoder(codecs.getincrementaldecoder(encoding)(errors="replace"), translate=True)
+
+    with open(content_path, "wb") as f:
+        async for chunk in chunks:
+            if decoder is None:
+                sample += chunk
+                if len(sample) < Config.TEXT_DETECT_BYTES:
+                    continue
+                decoder = start_decoder(complete=False)
+                chunk, sample = sample, b""
+            text = decoder.decode(chunk)
+            if text:
+                bytes_written += await asyncio.to_thread(_write, f, text)
+                await tally.add(text)
+
+        if decoder is None:
+            decoder = start_decoder(complete=True)
+        text = decoder.decode(sample, final=True)
+        if text:
+            bytes_written += await asyncio.to_thread(_write, f, text)
+            await tally.add(text)
+    return encoding, bytes_written, await tally.finish()
@@ -0,0 +1,168 @@
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+import os
+import threading
+from typing import List, Optional, Sequence, Tuple
+from asset_processing_service.config import Config
+from asset_processing_service.logger import logger
+
+# How far into each side of a join the boundary correction looks.
+JOIN_WINDOW_CHARS = 64
+# Text held back by TokenTally while waiting for a safe cut point.
+TALLY_MAX_PENDING_CHARS = 1024 * 1024
+
+
+def _is_cut_point(text: str, index: int) -> bool:
+    """A single space between two non-whitespace characters always starts a new pre-token."""
+    return (
+        text[index] == " "
+        and 0 < index < len(text) - 1
+        and not text[index - 1].isspace()
+        and not text[index + 1].isspace()
+    )
+
+
+def _last_cut_point(text: str) -> Optional[int]:
+    index = text.rfind(" ")
+    while index > 0:
+        if _is_cut_point(text, index):
+            return index
+        index = text.rfind(" ", 0, index)
+    return None
+
+
+def _boundary_cuts(text: str) -> Optional[Tuple[int, int]]:
+    """
+        Cut points near each end of text: text[:head] and text[tail:] can be
+        encoded on their own without changing the total token count. None
+        when the text is too short or has no safe cut point, in which case
+        the whole text belongs to the join window.
+    """
+    head = next(
+        (i for i in range(min(JOIN_WINDOW_CHARS, len(text) - 1), 0, -1) if _is_cut_point(text, i)),
+        None,
+    )
+    tail = next(
+        (i for i in range(max(1, len(text) - JOIN_WINDOW_CHARS), len(text)) if _is_cut_point(text, i)),
+        None,
+    )
+    if head is None or tail is None or head > tail:
+        return None
+    return head, tail
+
+
+class TokenCounter:
+    """
+        Loads the tokenizer once and counts tokens on a small worker pool so
+        long transcripts never stall the event loop.
+    """
+
+    def __init__(self, model: str, max_workers: int):
+        self.model = model
+        self._encoding = None
+        self._load_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="tokens")
+
+    def load(self):
+        """
+            Load the tokenizer, importing tiktoken on first use. The BPE data is
+            read from TIKTOKEN_CACHE_DIR and only downloaded when missing there.
+        """
+        with self._load_lock:
+            if self._encoding is None:
+                os.environ["TIKTOKEN_CACHE_DIR"] = Config.TIKTOKEN_CACHE_DIR
+                import tiktoken
+                self._encoding = tiktoken.encoding_for_model(self.model)
+                logger.info(f"Loaded {self._encoding.name} tokenizer for {self.model}")
+        return self._encoding
+
+    def count_sync(self, text: str) -> int:
+        return len(self.load().encode_ordinary(text))
+
+    def join_correction_sync(self, texts: Sequence[str], separator: str) -> int:
+        """
+            Tokens gained or lost by joining texts with separator, compared with
+            counting each text on its own. Only a window around each join is
+            re-encoded. Windows are cut at pre-token boundaries, and texts too
+            short to cut are taken whole, so the result matches a full re-count.
+        """
+        correction = 0
+        window: List[str] = []
+
+        def close_window() -> int:
+            return self.count_sync(separator.join(window)) - sum(self.count_sync(piece) for piece in window)
+
+        for index, text in enumerate(texts):
+            cuts = _boundary_cuts(text)
+            if cuts is None:
+                window.append(text)
+                continue
+            head, tail = cuts
+            if index > 0:
+                window.append(text[:head])
+                correction += close_window()
+            window = [text[tail:]]
+        if len(window) > 1:
+            correction += close_window()
+        return correction
+
+    def start(self) -> None:
+        """
+            Start loading the tokenizer in the background, so polling for jobs
+            does not wait for it. A failure here is retried on first use.
+        """
+        loop = asyncio.get_running_loop()
+        loop.run_in_executor(self._executor, self.load).add_done_callback(self._log_load_error)
+
+    def _log_load_error(self, future: Future) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f"Error loading tokenizer for {self.model}: {future.exception()}")
+
+    async def count(self, text: str) -> int:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.count_sync, text)
+
+    async def count_joined(self, texts: List[str], counts: List[int], separator: str = "\n") -> int:
+        """Token count of separator.join(texts), given per-text counts, without a second full pass."""
+        loop = asyncio.get_running_loop()
+        correction = await loop.run_in_executor(
+            self._executor, self.join_correction_sync, texts, separator
+        )
+        return sum(counts) + correction
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class TokenTally:
+    """
+        Counts the tokens of text that arrives in pieces. Each piece is counted
+        up to its last safe cut point and the rest is carried into the next,
+        so the total matches counting the whole text at once. Text with no cut
+        point for TALLY_MAX_PENDING_CHARS is counted where it stands.
+    """
+
+    def __init__(self, counter: TokenCounter):
+        self._counter = counter
+        self._pending = ""
+        self.total = 0
+
+    async def add(self, text: str) -> None:
+        text = self._pending + text
+        cut = _last_cut_point(text)
+        if cut is None:
+            if len(text) < TALLY_MAX_PENDING_CHARS:
+                self._pending = text
+                return
+            cut = len(text)
+        self._pending = text[cut:]
+        self.total += await self._counter.count(text[:cut])
+
+    async def finish(self) -> int:
+        if self._pending:
+            self.total += await self._counter.count(self._pending)
+            self._pending = ""
+        return self.total
+
+
+token_counter = TokenCounter(Config.TOKEN_COUNT_MODEL, Config.TOKEN_COUNT_WORKERS)
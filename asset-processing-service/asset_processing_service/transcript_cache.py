@@ -0,0 +1,131 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, Optional
+from asset_processing_service.config import Config
+from asset_processing_service.logger import logger
+
+
+def sha256_file(path: str, block_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def transcript_key(kind: str, content_sha256: str, settings: str = "") -> str:
+    """
+        Cache key for a transcript of the given content. The backend and model
+        are part of the key, so fake transcripts or another model's output are
+        never served. settings covers anything else the transcript depends on.
+    """
+    return hashlib.sha256(
+        f"{kind}:{Config.TRANSCRIPTION_BACKEND}:{Config.OPENAI_MODEL}:{settings}:{content_sha256}".encode()
+    ).hexdigest()
+
+
+class TranscriptCache:
+    """
+        Persistent, content-addressed transcript store shared by every job
+        on the node. Entries are small JSON files; the least recently used
+        ones are evicted once the cache grows past max_bytes.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int, enabled: bool = True):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._size_bytes: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    yield path, stat.st_size, stat.st_mtime
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            # Touch the entry so eviction treats it as recently used.
+            os.utime(path)
+            return entry
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.error(f"Discarding unreadable transcript cache entry {path}: {e}")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+    def put(self, key: str, text: str, token_count: Optional[int] = None) -> None:
+        if not self.enabled:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"text": text, "token_count": token_count}, f)
+        os.replace(temp_path, path)
+
+        with self._lock:
+            if self._size_bytes is None:
+                self._size_bytes = sum(size for _, size, _ in self._entries())
+            else:
+                self._size_bytes += os.path.getsize(path)
+            if self._size_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        removed = 0
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except OSError:
+                continue
+        self._size_bytes = total
+        logger.info(f"Evicted {removed} transcript cache entries. Cache size: {total} bytes")
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        return await asyncio.to_thread(self.get, key)
+
+    async def aput(self, key: str, text: str, token_count: Optional[int] = None) -> None:
+        if not self.enabled:
+            return
+        try:
+            await asyncio.to_thread(self.put, key, text, token_count)
+        except OSError as e:
+            logger.error(f"Error writing transcript cache entry: {e}")
+
+
+transcript_cache = TranscriptCache(
+    Config.TRANSCRIPT_CACHE_DIR,
+    Config.TRANSCRIPT_CACHE_MAX_BYTES,
+    enabled=Config.TRANSCRIPT_CACHE_ENABLED,
+)
@@ -0,0 +1,185 @@
+import asyncio
+import os
+import random
+from typing import Optional
+from asset_processing_service.config import Config
+from asset_processing_service.logger import logger
+
+
+class RetryableTranscriptionError(Exception):
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        self.message = message
+        self.retry_after = retry_after
+        super().__init__(self.message)
+
+
+class TranscriptionBackend:
+    """
+        Speech-to-text provider. Implementations raise
+        RetryableTranscriptionError for failures worth retrying.
+    """
+
+    async def transcribe(self, audio_path: str) -> str:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+def _retry_after_seconds(response) -> Optional[float]:
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        return None
+    return None
+
+
+class OpenAITranscriptionBackend(TranscriptionBackend):
+    def __init__(self, api_key: str, model: str):
+        self.model = model
+        from openai import AsyncOpenAI
+
+        # Retries are handled by TranscriptionEngine so they respect the shared concurrency limit.
+        self._client = AsyncOpenAI(api_key=api_key, max_retries=0)
+
+    async def transcribe(self, audio_path: str) -> str:
+        import openai
+
+        try:
+            with open(audio_path, "rb") as audio_file:
+                transcription = await self._client.audio.transcriptions.create(
+                    model=self.model, file=audio_file
+                )
+            return transcription.text
+        except openai.RateLimitError as error:
+            raise RetryableTranscriptionError(
+                f"Rate limited: {error}", retry_after=_retry_after_seconds(error.response)
+            )
+        except openai.InternalServerError as error:
+            raise RetryableTranscriptionError(
+                f"Server error: {error}", retry_after=_retry_after_seconds(error.response)
+            )
+        except openai.APIConnectionError as error:
+            raise RetryableTranscriptionError(f"Connection error: {error}")
+
+    async def close(self) -> None:
+        await self._client.close()
+
+
+class FakeTranscriptionBackend(TranscriptionBackend):
+    """
+        Offline backend that sleeps for a fixed latency and returns a
+        deterministic transcript. Records peak concurrency so scheduling
+        behaviour can be checked without network access.
+    """
+
+    def __init__(self, latency_seconds: float = 0.5):
+        self.latency_seconds = latency_seconds
+        self.calls = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    async def transcribe(self, audio_path: str) -> str:
+        self.calls += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency_seconds)
+            size = os.path.getsize(audio_path)
+            return f"Transcript of {os.path.basename(audio_path)} ({size} bytes)."
+        finally:
+            self.in_flight -= 1
+
+
+class TranscriptionEngine:
+    """
+        Shares one backend across all jobs, caps in-flight requests with a
+        global semaphore and retries transient failures with jittered
+        exponential backoff, honouring Retry-After when the API sends it.
+    """
+
+    def __init__(
+        self,
+        backend: TranscriptionBackend,
+        max_concurrency: int,
+        max_retries: int,
+        backoff_base_seconds: float,
+        backoff_max_seconds: float,
+    ):
+        self.backend = backend
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    def _backoff_seconds(self, attempt: int, retry_after: Optional[float]) -> float:
+        ceiling = min(self.backoff_max_seconds, self.backoff_base_seconds * (2 ** attempt))
+        delay = random.uniform(0, ceiling)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    async def transcribe(self, audio_path: str) -> str:
+        attempt = 0
+        while True:
+            async with self._semaphore:
+                try:
+                    return await self.backend.transcribe(audio_path)
+                except RetryableTranscriptionError as error:
+                    if attempt >= self.max_retries:
+                        logger.error(f"Giving up on {audio_path} after {attempt + 1} attempts: {error}")
+                        raise
+                    delay = self._backoff_seconds(attempt, error.retry_after)
+                    logger.warning(
+                        f"Transcription attempt {attempt + 1} for {audio_path} failed ({error}). "
+                        f"Retrying in {delay:.2f}s",
+                        extra={"rate_limit": "transcription_retry"},
+                    )
+            # Back off outside the semaphore so other chunks can use the slot.
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+
+def create_transcription_backend() -> TranscriptionBackend:
+    if Config.TRANSCRIPTION_BACKEND == "fake":
+        return FakeTranscriptionBackend(Config.FAKE_TRANSCRIPTION_LATENCY_SECONDS)
+    if Config.TRANSCRIPTION_BACKEND == "openai":
+        return OpenAITranscriptionBackend(Config.OPENAI_API_KEY, Config.OPENAI_MODEL)
+    raise ValueError(f"Unknown transcription backend: {Config.TRANSCRIPTION_BACKEND}")
+
+
+_transcription_engine: Optional[TranscriptionEngine] = None
+
+
+def get_transcription_engine() -> TranscriptionEngine:
+    global _transcription_engine
+    if _transcription_engine is None:
+        _transcription_engine = TranscriptionEngine(
+            create_transcription_backend(),
+            max_concurrency=Config.TRANSCRIPTION_MAX_CONCURRENCY,
+            max_retries=Config.TRANSCRIPTION_MAX_RETRIES,
+            backoff_base_seconds=Config.TRANSCRIPTION_BACKOFF_BASE_SECONDS,
+            backoff_max_seconds=Config.TRANSCRIPTION_BACKOFF_MAX_SECONDS,
+        )
+    return _transcription_engine
+
+
+def set_transcription_engine(engine: Optional[TranscriptionEngine]) -> None:
+    global _transcription_engine
+    _transcription_engine = engine
+
+
+async def close_transcription_engine() -> None:
+    global _transcription_engine
+    if _transcription_engine is not None:
+        await _transcription_engine.close()
+        _transcription_engine = None
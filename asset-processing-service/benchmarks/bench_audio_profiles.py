@@ -0,0 +1,128 @@
+"""
+    Compare audio encoding profiles and split modes on a long synthetic
+    speech-like recording: bytes sent to transcription, chunk count, wall
+    time and how many segment boundaries fall inside detected silences.
+
+    Usage:
+        python benchmarks/bench_audio_profiles.py --minutes 60
+        python benchmarks/bench_audio_profiles.py --input /path/to/audio.wav --json
+
+    The generated input alternates tone bursts with short gaps, so there are
+    silences to cut at. Boundaries for the "fixed" mode are multiples of the
+    segment time; for "silence" they are the planned cut times.
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SERVER_API_KEY", "benchmark")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+VARIANTS = [
+    ("standard", "fixed"),
+    ("standard", "silence"),
+    ("speech", "fixed"),
+    ("speech", "silence"),
+]
+
+
+def generate_audio(path: str, minutes: float) -> None:
+    # 7.9s of tone, then 1.4s of silence, repeating.
+    subprocess.run(
+        [
+            "ffmpeg", "-loglevel", "error", "-y",
+            "-f", "lavfi", "-i", "aevalsrc=0.5*sin(2*PI*220*t)*lt(mod(t\\,9.3)\\,7.9):s=44100:c=stereo",
+            "-t", str(int(minutes * 60)),
+            path,
+        ],
+        check=True,
+    )
+
+
+def in_silence(cut: float, silences) -> bool:
+    return any(start <= cut <= end for start, end in silences)
+
+
+async def run_variant(profile: str, split: str, input_path: str, max_chunk_size_bytes: int, silences) -> dict:
+    import ffmpeg
+    from asset_processing_service.audio_encoding import encoding_profile
+    from asset_processing_service.config import Config
+    from asset_processing_service.media_processor import encode_audio_segments, plan_segments, segment_duration_for
+
+    Config.AUDIO_PROFILE = profile
+    Config.SILENCE_SPLIT = split == "silence"
+    segment_time = segment_duration_for(max_chunk_size_bytes, encoding_profile()["bitrate_kbps"])
+    duration = float(ffmpeg.probe(input_path)["format"]["duration"])
+    options = await plan_segments(input_path, segment_time, duration)
+    if "segment_times" in options:
+        cuts = [float(cut) for cut in options["segment_times"].split(",")]
+    else:
+        cuts = [segment_time * k for k in range(1, int(duration // segment_time) + 1) if segment_time * k < duration]
+
+    work_dir = tempfile.mkdtemp(prefix=f"bench-{profile}-{split}-")
+    try:
+        started = time.perf_counter()
+        chunks = await encode_audio_segments(input_path, max_chunk_size_bytes, work_dir)
+        wall_seconds = time.perf_counter() - started
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return {
+        "profile": profile,
+        "split": split,
+        "wall_seconds": round(wall_seconds, 3),
+        "chunks": len(chunks),
+        "upload_bytes": sum(chunk["size"] for chunk in chunks),
+        "cuts": len(cuts),
+        "cuts_in_silence": sum(1 for cut in cuts if in_silence(cut, silences)),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", help="Existing audio to benchmark (generated if omitted)")
+    parser.add_argument("--minutes", type=float, default=60.0, help="Length of the generated audio")
+    parser.add_argument("--max-chunk-size-bytes", type=int, default=24 * 1024 * 1024)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    from asset_processing_service.audio_encoding import detect_silences
+
+    scratch_dir = None
+    input_path = args.input
+    if not input_path:
+        scratch_dir = tempfile.mkdtemp(prefix="bench-input-")
+        input_path = os.path.join(scratch_dir, "input.wav")
+        print(f"Generating {args.minutes} minutes of synthetic audio...", file=sys.stderr)
+        generate_audio(input_path, args.minutes)
+    input_bytes = os.path.getsize(input_path)
+
+    try:
+        silences = detect_silences(input_path)
+        results = [
+            asyncio.run(run_variant(profile, split, input_path, args.max_chunk_size_bytes, silences))
+            for profile, split in VARIANTS
+        ]
+    finally:
+        if scratch_dir:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps({"input_bytes": input_bytes, "results": results}, indent=2))
+        return
+    print(f"{'profile':<9} {'split':<8} {'wall (s)':>9} {'chunks':>7} {'upload (MiB)':>13} {'cuts in silence':>16}")
+    for result in results:
+        print(
+            f"{result['profile']:<9} {result['split']:<8} {result['wall_seconds']:>9.2f} {result['chunks']:>7} "
+            f"{result['upload_bytes'] / 2**20:>13.2f} {result['cuts_in_silence']:>9}/{result['cuts']:<6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
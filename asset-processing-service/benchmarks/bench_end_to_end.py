@@ -0,0 +1,405 @@
+"""
+    Offline end-to-end benchmark: run the whole service against a local
+    stand-in for the Next.js API, with the fake transcription backend.
+
+    Usage:
+        python benchmarks/bench_end_to_end.py
+        python benchmarks/bench_end_to_end.py --mix default --latency 1.0 --json
+        python benchmarks/bench_end_to_end.py --processes 2 --output run.json
+
+    Synthetic audio, video and text assets are generated with ffmpeg (and
+    kept in --assets-dir between runs). The measured run happens in a child
+    process, so peak RSS covers only the service and the ffmpeg processes it
+    started. Jobs are created up front in a fixed order, or one every
+    --arrival-interval seconds, and latency is measured from the moment a
+    job becomes visible to the moment it reaches a terminal status.
+"""
+import argparse
+import asyncio
+from collections import Counter
+from datetime import datetime, timezone
+import json
+import logging
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TERMINAL_STATUSES = ("completed", "max_attempts_exceeded")
+
+# kind -> {name: (generator arguments)}. Durations are seconds, text sizes are bytes.
+ASSETS = {
+    "audio": {"audio-30s.wav": 30, "audio-5m.mp3": 300, "audio-20m.wav": 1200},
+    "video": {"video-1m.mp4": 60, "video-10m.mp4": 600},
+    "text": {"text-10k.txt": 10 * 1024, "text-1m.md": 1024 * 1024},
+}
+
+# (fileType, mimeType) by extension, as the upload step stores them.
+ASSET_TYPES = {
+    ".wav": ("audio", "audio/wav"),
+    ".mp3": ("audio", "audio/mpeg"),
+    ".mp4": ("video", "video/mp4"),
+    ".txt": ("text/plain", "text/plain"),
+    ".md": ("text/markdown", "text/markdown"),
+}
+
+# Fixed job mixes: list of (asset name, number of jobs).
+MIXES = {
+    "smoke": [("audio-30s.wav", 1), ("video-1m.mp4", 1), ("text-10k.txt", 1)],
+    "default": [
+        ("text-10k.txt", 8),
+        ("text-1m.md", 2),
+        ("audio-30s.wav", 6),
+        ("audio-5m.mp3", 3),
+        ("audio-20m.wav", 1),
+        ("video-1m.mp4", 3),
+        ("video-10m.mp4", 1),
+    ],
+}
+
+
+def asset_kind(name: str) -> str:
+    return next(kind for kind, names in ASSETS.items() if name in names)
+
+
+def generate_asset(path: str, name: str) -> None:
+    kind = asset_kind(name)
+    value = ASSETS[kind][name]
+    if kind == "text":
+        sentence = "The quick brown fox jumps over the lazy dog while the marketing team ships another campaign.\n"
+        with open(path, "w", encoding="utf-8") as f:
+            f.write((sentence * (value // len(sentence) + 1))[:value])
+        return
+    inputs = ["-f", "lavfi", "-i", "sine=frequency=440:sample_rate=44100"]
+    codec = ["-c:a", "libmp3lame", "-b:a", "128k"] if name.endswith(".mp3") else []
+    if kind == "video":
+        inputs = ["-f", "lavfi", "-i", "testsrc=size=320x240:rate=15"] + inputs
+        codec = ["-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", "-b:a", "128k"]
+    subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-y", *inputs, "-t", str(value), *codec, path],
+        check=True,
+    )
+
+
+def prepare_assets(assets_dir: str, mix) -> None:
+    os.makedirs(assets_dir, exist_ok=True)
+    for name, _ in mix:
+        path = os.path.join(assets_dir, name)
+        if not os.path.exists(path):
+            print(f"Generating {name}...", file=sys.stderr)
+            generate_asset(path, name)
+
+
+def percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(values):
+    return {
+        "count": len(values),
+        "p50": round(percentile(values, 0.5), 3),
+        "p90": round(percentile(values, 0.9), 3),
+        "p99": round(percentile(values, 0.99), 3),
+        "max": round(max(values, default=0.0), 3),
+    }
+
+
+class StandInApi:
+    """
+        In-memory stand-in for the Next.js /asset-processing-job and /asset
+        routes, with the same filtering, ordering and PATCH semantics.
+        Counts every request it serves.
+    """
+
+    def __init__(self, assets_dir: str, mix, arrival_interval: float):
+        self.assets_dir = assets_dir
+        self.base_url = None
+        self.jobs = {}
+        self.assets = {}
+        self.visible_at = {}
+        self.finished_at = {}
+        self.requests = Counter()
+        self.request_bytes = 0
+        self.started_at = None
+        self._mix = mix
+        self._arrival_interval = arrival_interval
+
+    def seed(self, port: int) -> None:
+        self.base_url = f"http://127.0.0.1:{port}"
+        self.started_at = time.monotonic()
+        index = 0
+        for name, count in self._mix:
+            path = os.path.join(self.assets_dir, name)
+            file_type, mime_type = ASSET_TYPES[os.path.splitext(name)[1]]
+            for _ in range(count):
+                job_id = f"job-{index:04d}"
+                asset_id = f"asset-{index:04d}"
+                created_at = datetime.now(timezone.utc).isoformat()
+                self.assets[asset_id] = {
+                    "id": asset_id,
+                    "projectId": f"project-{index % 3}",
+                    "title": name,
+                    "fileName": name,
+                    "fileUrl": f"{self.base_url}/files/{name}",
+                    "fileType": file_type,
+                    "mimeType": mime_type,
+                    "size": os.path.getsize(path),
+                    "content": "",
+                    "tokenCount": 0,
+                }
+                self.jobs[job_id] = {
+                    "id": job_id,
+                    "assetId": asset_id,
+                    "projectId": self.assets[asset_id]["projectId"],
+                    "status": "created",
+                    "attempts": 0,
+                    "createdAt": created_at,
+                    "updatedAt": created_at,
+                    "lastHeartBeat": created_at,
+                    "errorMessage": None,
+                }
+                self.visible_at[job_id] = self.started_at + index * self._arrival_interval
+                index += 1
+
+    def all_finished(self) -> bool:
+        return len(self.finished_at) == len(self.jobs)
+
+    def app(self):
+        from aiohttp import web
+
+        @web.middleware
+        async def count_requests(request, handler):
+            route = request.path if not request.path.startswith("/files/") else "/files"
+            self.requests[f"{request.method} {route}"] += 1
+            self.request_bytes += request.content_length or 0
+            return await handler(request)
+
+        async def get_jobs(request):
+            statuses = request.query.get("status", "created,failed,in_progress").split(",")
+            limit = request.query.get("limit")
+            now = time.monotonic()
+            jobs = [
+                job for job in self.jobs.values()
+                if job["status"] in statuses and self.visible_at[job["id"]] <= now
+            ]
+            if limit:
+                jobs = jobs[: int(limit)]
+            return web.json_response(jobs)
+
+        async def patch_job(request):
+            job_id = request.query["jobId"]
+            body = await request.json()
+            job = self.jobs[job_id]
+            if "status" in body:
+                job["status"] = body["status"]
+            job["errorMessage"] = body.get("errorMessage")
+            job["attempts"] = body.get("attempts", 0)
+            job["lastHeartBeat"] = body.get("lastHeartBeat", job["lastHeartBeat"])
+            job["updatedAt"] = datetime.now(timezone.utc).isoformat()
+            if job["status"] in TERMINAL_STATUSES and job_id not in self.finished_at:
+                self.finished_at[job_id] = time.monotonic()
+            return web.json_response({"success": True, "updatedJob": job})
+
+        async def get_asset(request):
+            return web.json_response(self.assets[request.query["assetId"]])
+
+        async def patch_asset(request):
+            body = await request.json()
+            self.assets[request.query["assetId"]].update(body)
+            return web.json_response(self.assets[request.query["assetId"]])
+
+        app = web.Application(middlewares=[count_requests], client_max_size=1024 ** 3)
+        app.router.add_get("/api/asset-processing-job", get_jobs)
+        app.router.add_patch("/api/asset-processing-job", patch_job)
+        app.router.add_get("/api/asset", get_asset)
+        app.router.add_patch("/api/asset", patch_asset)
+        app.router.add_static("/files", self.assets_dir)
+        return app
+
+    def report(self):
+        latencies = []
+        by_kind = {}
+        statuses = Counter()
+        for job_id, job in self.jobs.items():
+            statuses[job["status"]] += 1
+            if job_id not in self.finished_at:
+                continue
+            latency = self.finished_at[job_id] - self.visible_at[job_id]
+            kind = self.assets[job["assetId"]]["fileType"]
+            by_kind.setdefault(kind, []).append(latency)
+            latencies.append(latency)
+        return {
+            "statuses": dict(statuses),
+            "latency_seconds": summarize(latencies),
+            "latency_seconds_by_type": {kind: summarize(values) for kind, values in sorted(by_kind.items())},
+            "http_requests": dict(sorted(self.requests.items())),
+            "http_requests_total": sum(self.requests.values()),
+            "http_request_body_bytes": self.request_bytes,
+        }
+
+
+async def measured_run(api: StandInApi, port: int, processes: int, timeout: float, fake_tokenizer: bool) -> float:
+    from aiohttp import web
+    from asset_processing_service.logger import logger
+    from asset_processing_service.main import async_main
+    from asset_processing_service.supervisor import supervisor_main
+    from asset_processing_service.token_counter import token_counter
+
+    logger.setLevel(logging.WARNING)
+    if fake_tokenizer:
+        # Only for machines without the tiktoken BPE files cached; counts are then approximate.
+        token_counter._encoding = WhitespaceEncoding()
+
+    runner = web.AppRunner(api.app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    api.seed(port)
+
+    started = time.monotonic()
+    service = asyncio.create_task(supervisor_main(processes) if processes > 1 else async_main())
+    try:
+        while not api.all_finished() and time.monotonic() - started < timeout:
+            if service.done():
+                service.result()
+                break
+            await asyncio.sleep(0.05)
+        wall_seconds = time.monotonic() - started
+    finally:
+        service.cancel()
+        try:
+            await service
+        except BaseException:
+            pass
+        await runner.cleanup()
+    return wall_seconds
+
+
+class WhitespaceEncoding:
+    name = "whitespace"
+
+    def encode_ordinary(self, text):
+        return text.split()
+
+
+def run_child(args) -> None:
+    from asset_processing_service.config import Config
+
+    api = StandInApi(args.assets_dir, MIXES[args.mix], args.arrival_interval)
+    wall_seconds = asyncio.run(measured_run(api, args.port, args.processes, args.timeout, args.fake_tokenizer))
+    report = api.report()
+    completed = report["statuses"].get("completed", 0)
+    result = {
+        "mix": args.mix,
+        "jobs": len(api.jobs),
+        "processes": args.processes,
+        "workers_per_process": Config.MAX_NUM_WORKERS,
+        "transcription_latency_seconds": args.latency,
+        "wall_seconds": round(wall_seconds, 3),
+        "timed_out": not api.all_finished(),
+        "jobs_per_minute": round(completed / wall_seconds * 60, 2) if wall_seconds else 0.0,
+        **report,
+        # ru_maxrss is reported in KiB on Linux.
+        "python_peak_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        "children_peak_rss_bytes": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024,
+    }
+    with open(args.result_path, "w", encoding="utf-8") as f:
+        json.dump(result, f)
+
+
+def print_report(result: dict) -> None:
+    print(
+        f"{result['jobs']} jobs ({result['mix']} mix), {result['processes']} process(es) x "
+        f"{result['workers_per_process']} workers, transcription latency {result['transcription_latency_seconds']}s"
+    )
+    print(f"  wall time       {result['wall_seconds']:.1f}s{' (timed out)' if result['timed_out'] else ''}")
+    print(f"  throughput      {result['jobs_per_minute']:.1f} completed jobs/min")
+    print(f"  statuses        {result['statuses']}")
+    rows = [("all", result["latency_seconds"])] + list(result["latency_seconds_by_type"].items())
+    for name, stats in rows:
+        print(
+            f"  latency {name:<8} n={stats['count']:<4} p50={stats['p50']:>7.2f}s "
+            f"p90={stats['p90']:>7.2f}s p99={stats['p99']:>7.2f}s max={stats['max']:>7.2f}s"
+        )
+    print(f"  peak RSS        python {result['python_peak_rss_bytes'] / 2 ** 20:.0f} MiB, "
+          f"children {result['children_peak_rss_bytes'] / 2 ** 20:.0f} MiB")
+    print(f"  HTTP requests   {result['http_requests_total']} total")
+    for route, count in result["http_requests"].items():
+        print(f"    {route:<36} {count}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mix", choices=sorted(MIXES), default="smoke")
+    parser.add_argument("--latency", type=float, default=0.5, help="Fake transcription latency per chunk (seconds)")
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes (above 1 uses supervisor mode)")
+    parser.add_argument("--arrival-interval", type=float, default=0.0, help="Seconds between job arrivals")
+    parser.add_argument("--timeout", type=float, default=900.0, help="Give up after this many seconds")
+    parser.add_argument("--port", type=int, default=8791)
+    parser.add_argument("--assets-dir", default=os.path.join(tempfile.gettempdir(), "asset-processing-bench-assets"))
+    parser.add_argument("--fake-tokenizer", action="store_true", help="Count tokens by whitespace instead of tiktoken")
+    parser.add_argument("--output", help="Also write the JSON result to this file")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    parser.add_argument("--result-path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.fake_tokenizer and args.processes > 1:
+        parser.error("--fake-tokenizer only applies to single-process runs")
+
+    if args.result_path:
+        run_child(args)
+        return
+
+    prepare_assets(args.assets_dir, MIXES[args.mix])
+    scratch_dir = tempfile.mkdtemp(prefix="bench-e2e-")
+    result_path = os.path.join(scratch_dir, "result.json")
+    env = {
+        **os.environ,
+        "SERVER_API_KEY": "benchmark",
+        "OPENAI_API_KEY": "benchmark",
+        "API_BASE_URL": f"http://127.0.0.1:{args.port}/api",
+        "TRANSCRIPTION_BACKEND": "fake",
+        "FAKE_TRANSCRIPTION_LATENCY_SECONDS": str(args.latency),
+        "WORK_DIR": os.path.join(scratch_dir, "work"),
+        "TRANSCRIPT_CACHE_ENABLED": "false",
+        "JOB_UPDATE_FLUSH_INTERVAL_SECONDS": os.environ.get("JOB_UPDATE_FLUSH_INTERVAL_SECONDS", "0.2"),
+    }
+    try:
+        child_args = [
+            sys.executable, os.path.abspath(__file__),
+            "--mix", args.mix,
+            "--latency", str(args.latency),
+            "--processes", str(args.processes),
+            "--arrival-interval", str(args.arrival_interval),
+            "--timeout", str(args.timeout),
+            "--port", str(args.port),
+            "--assets-dir", args.assets_dir,
+            "--result-path", result_path,
+        ]
+        if args.fake_tokenizer:
+            child_args.append("--fake-tokenizer")
+        # Service logs go to stdout; keep them out of the report.
+        subprocess.run(child_args, check=True, env=env, cwd=scratch_dir, stdout=sys.stderr)
+        with open(result_path, "r", encoding="utf-8") as f:
+            result = json.load(f)
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+    Startup-time benchmark: how long the service takes from process start
+    until it first asks the API for jobs, and which heavy modules a plain
+    import of asset_processing_service.main pulls in.
+
+    Usage:
+        python benchmarks/bench_startup.py
+        python benchmarks/bench_startup.py --runs 20 --json
+
+    The service runs against a local stand-in API that answers every job
+    poll with an empty list. Each run starts a fresh interpreter, so the
+    numbers include interpreter start-up and all module imports.
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from aiohttp import web
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that should only load once a job actually needs them.
+DEFERRED_MODULES = ["openai", "tiktoken", "ffmpeg", "charset_normalizer", "aiohttp.web"]
+
+
+def service_env(api_base_url: str, scratch_dir: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "API_BASE_URL": api_base_url,
+        "SERVER_API_KEY": env.get("SERVER_API_KEY", "benchmark"),
+        "OPENAI_API_KEY": env.get("OPENAI_API_KEY", "benchmark"),
+        "WORK_DIR": os.path.join(scratch_dir, "work"),
+        "TRANSCRIPT_CACHE_DIR": os.path.join(scratch_dir, "cache"),
+        "METRICS_PORT": "0",
+        "WORKER_PROCESSES": "1",
+    })
+    return env
+
+
+async def time_to_first_fetch(env: dict, timeout: float) -> float:
+    first_fetch = asyncio.get_running_loop().create_future()
+
+    async def jobs(request: web.Request) -> web.Response:
+        if not first_fetch.done():
+            first_fetch.set_result(time.perf_counter())
+        return web.json_response([])
+
+    app = web.Application()
+    app.router.add_get("/api/asset-processing-job", jobs)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    env = {**env, "API_BASE_URL": f"http://127.0.0.1:{port}/api"}
+
+    started = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "asset_processing_service.main",
+        cwd=SERVICE_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        fetched_at = await asyncio.wait_for(first_fetch, timeout)
+        return fetched_at - started
+    finally:
+        process.terminate()
+        await process.wait()
+        await runner.cleanup()
+
+
+def time_import(env: dict) -> float:
+    started = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-c", "import asset_processing_service.main"],
+        cwd=SERVICE_DIR, env=env, check=True, stdout=sys.stderr,
+    )
+    return time.perf_counter() - started
+
+
+def loaded_at_import(env: dict, scratch_dir: str) -> list:
+    # The service logs to stdout, so the child writes its answer to a file.
+    result_path = os.path.join(scratch_dir, "loaded_at_import.json")
+    script = (
+        "import json, sys, asset_processing_service.main; "
+        "f = open(sys.argv[1], 'w', encoding='utf-8'); "
+        f"json.dump([name for name in {DEFERRED_MODULES!r} if name in sys.modules], f); "
+        "f.close()"
+    )
+    subprocess.run(
+        [sys.executable, "-c", script, result_path],
+        cwd=SERVICE_DIR, env=env, check=True, stdout=sys.stderr,
+    )
+    with open(result_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def summarize(samples: list) -> dict:
+    return {
+        "median_seconds": round(statistics.median(samples), 3),
+        "min_seconds": round(min(samples), 3),
+        "max_seconds": round(max(samples), 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=60, help="Seconds to wait for the first fetch")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    scratch_dir = tempfile.mkdtemp(prefix="bench-startup-")
+    try:
+        env = service_env("http://127.0.0.1:9/api", scratch_dir)
+        imports = [time_import(env) for _ in range(args.runs)]
+        first_fetch = [asyncio.run(time_to_first_fetch(env, args.timeout)) for _ in range(args.runs)]
+        loaded = loaded_at_import(env, scratch_dir)
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    results = {
+        "runs": args.runs,
+        "import": summarize(imports),
+        "first_fetch": summarize(first_fetch),
+        "heavy_modules_loaded_at_import": loaded,
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'measure':<12} {'median (s)':>11} {'min (s)':>9} {'max (s)':>9}")
+    for name in ("import", "first_fetch"):
+        summary = results[name]
+        print(
+            f"{name:<12} {summary['median_seconds']:>11.3f} "
+            f"{summary['min_seconds']:>9.3f} {summary['max_seconds']:>9.3f}"
+        )
+    print(f"Heavy modules loaded at import: {', '.join(loaded) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+    Compare the legacy three-pass video-to-chunks path against the
+    single-pass ffmpeg pipeline on a long synthetic video.
+
+    Usage:
+        python benchmarks/bench_video_split.py --hours 2
+        python benchmarks/bench_video_split.py --input /path/to/video.mp4 --json
+
+    Each variant runs in its own child process so peak RSS (for both the
+    Python process and the ffmpeg children) is measured in isolation. The
+    single-pass variant runs with SINGLE_PASS_ENV so it does the same work
+    as the legacy path: full-quality audio cut at fixed lengths.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SERVER_API_KEY", "benchmark")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+VARIANTS = ["legacy", "single-pass"]
+
+# The legacy path kept the source sample rate and channels and cut at fixed
+# lengths. Pin the settings that would otherwise change what the single-pass
+# run encodes, or add a silence-detection pass, whatever the caller's env says.
+SINGLE_PASS_ENV = {
+    "AUDIO_PROFILE": "standard",
+    "SILENCE_SPLIT": "false",
+    "STREAMING_PIPELINE": "false",
+}
+
+
+def generate_video(path: str, hours: float) -> None:
+    seconds = int(hours * 3600)
+    subprocess.run(
+        [
+            "ffmpeg", "-loglevel", "error", "-y",
+            "-f", "lavfi", "-i", "testsrc=size=160x120:rate=1",
+            "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=44100",
+            "-t", str(seconds),
+            "-c:v", "libx264", "-preset", "ultrafast",
+            "-c:a", "aac", "-b:a", "128k",
+            path,
+        ],
+        check=True,
+    )
+
+
+async def run_legacy(input_path: str, work_dir: str, max_chunk_size_bytes: int) -> int:
+    """The pre-single-pass pipeline: encode, read back, rewrite, probe, segment, read chunks."""
+    import ffmpeg
+    from asset_processing_service.media_processor import collect_chunks
+
+    output_mp3 = os.path.join(work_dir, "legacy.mp3")
+    stream = ffmpeg.output(ffmpeg.input(input_path), output_mp3, acodec="libmp3lame", q=0, map="a")
+    await asyncio.to_thread(ffmpeg.run, stream, capture_stdout=True, capture_stderr=True)
+    with open(output_mp3, "rb") as f:
+        mp3_buffer = f.read()
+
+    split_dir = tempfile.mkdtemp(dir=work_dir)
+    split_input = os.path.join(split_dir, "legacy.mp3")
+    with open(split_input, "wb") as f:
+        f.write(mp3_buffer)
+
+    probe = await asyncio.to_thread(ffmpeg.probe, split_input)
+    total_size = int(probe["format"]["size"])
+    duration = float(probe["format"]["duration"])
+    num_chunks = max(1, int((total_size + max_chunk_size_bytes - 1) / max_chunk_size_bytes))
+    split_cmd = ffmpeg.input(split_input).output(
+        os.path.join(split_dir, "legacy_chunk_%03d.mp3"),
+        format="segment",
+        segment_time=duration / num_chunks,
+        c="copy",
+        reset_timestamps=1,
+    )
+    await asyncio.to_thread(ffmpeg.run, split_cmd, capture_stdout=True, capture_stderr=True)
+    return len(collect_chunks(split_dir, "legacy_chunk_", max_chunk_size_bytes))
+
+
+async def run_single_pass(input_path: str, work_dir: str, max_chunk_size_bytes: int) -> int:
+    from asset_processing_service.media_processor import extract_audio_and_split
+
+    chunks = await extract_audio_and_split(input_path, max_chunk_size_bytes, work_dir)
+    return len(chunks)
+
+
+def run_variant(variant: str, input_path: str, max_chunk_size_bytes: int) -> dict:
+    work_dir = tempfile.mkdtemp(prefix=f"bench-{variant}-")
+    try:
+        runner = run_legacy if variant == "legacy" else run_single_pass
+        started = time.perf_counter()
+        num_chunks = asyncio.run(runner(input_path, work_dir, max_chunk_size_bytes))
+        wall_seconds = time.perf_counter() - started
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return {
+        "variant": variant,
+        "wall_seconds": round(wall_seconds, 3),
+        "chunks": num_chunks,
+        # ru_maxrss is reported in KiB on Linux.
+        "python_peak_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        "ffmpeg_peak_rss_bytes": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", help="Existing video to benchmark (generated if omitted)")
+    parser.add_argument("--hours", type=float, default=2.0, help="Length of the generated video")
+    parser.add_argument("--max-chunk-size-bytes", type=int, default=24 * 1024 * 1024)
+    parser.add_argument("--variant", choices=VARIANTS, help=argparse.SUPPRESS)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    parser.add_argument("--result-path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        result = run_variant(args.variant, args.input, args.max_chunk_size_bytes)
+        with open(args.result_path, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        return
+
+    scratch_dir = None
+    input_path = args.input
+    if not input_path:
+        scratch_dir = tempfile.mkdtemp(prefix="bench-input-")
+        input_path = os.path.join(scratch_dir, "input.mp4")
+        print(f"Generating {args.hours}h synthetic video...", file=sys.stderr)
+        generate_video(input_path, args.hours)
+    input_bytes = os.path.getsize(input_path)
+
+    result_dir = tempfile.mkdtemp(prefix="bench-results-")
+    try:
+        results = []
+        for variant in VARIANTS:
+            result_path = os.path.join(result_dir, f"{variant}.json")
+            env = {**os.environ, **SINGLE_PASS_ENV} if variant == "single-pass" else None
+            # Service logs go to stdout; keep them out of the report.
+            subprocess.run(
+                [
+                    sys.executable, os.path.abspath(__file__),
+                    "--variant", variant,
+                    "--input", input_path,
+                    "--max-chunk-size-bytes", str(args.max_chunk_size_bytes),
+                    "--result-path", result_path,
+                ],
+                check=True,
+                env=env,
+                stdout=sys.stderr,
+            )
+            with open(result_path, "r", encoding="utf-8") as f:
+                results.append(json.load(f))
+    finally:
+        shutil.rmtree(result_dir, ignore_errors=True)
+        if scratch_dir:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps({"input_bytes": input_bytes, "single_pass_env": SINGLE_PASS_ENV, "results": results}, indent=2))
+        return
+    print(f"single-pass settings: {' '.join(f'{name}={value}' for name, value in SINGLE_PASS_ENV.items())}")
+    print(f"{'variant':<12} {'wall (s)':>10} {'chunks':>7} {'python RSS (MiB)':>17} {'ffmpeg RSS (MiB)':>17}")
+    for result in results:
+        print(
+            f"{result['variant']:<12} {result['wall_seconds']:>10.2f} {result['chunks']:>7} "
+            f"{result['python_peak_rss_bytes'] / 2**20:>17.1f} {result['ffmpeg_peak_rss_bytes'] / 2**20:>17.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+
+# Config requires these at import time; the tests never reach a real API.
+os.environ.setdefault("SERVER_API_KEY", "test")
+os.environ.setdefault("OPENAI_API_KEY", "test")
@@ -0,0 +1,189 @@
+import asyncio
+import gzip
+import json
+import aiohttp
+import pytest
+from asset_processing_service import api_client as api_client_module
+from asset_processing_service.api_client import (
+    _content_body,
+    _file_text,
+    _memory_text,
+    api_client,
+    update_asset_content,
+    update_asset_content_file,
+)
+from asset_processing_service.config import config
+
+# Quotes, backslashes, control characters, line separators and characters
+# outside the BMP: everything json.dumps escapes in a way a bad split could break.
+TRICKY_TEXT = 'say "hi"\\n\\\\ \x00\x1f\t\r\n   café \U0001F600\U0001F468‍\U0001F469 end\\'
+
+
+async def collect(body) -> bytes:
+    return b"".join([piece async for piece in body])
+
+
+async def pieces_of(text: str, cuts):
+    start = 0
+    for end in list(cuts) + [len(text)]:
+        yield text[start:end]
+        start = end
+
+
+def expected_body(content: str, token_count: int) -> bytes:
+    return json.dumps({"content": content, "tokenCount": token_count}).encode("utf-8")
+
+
+@pytest.mark.parametrize("cut", range(len(TRICKY_TEXT) + 1))
+def test_content_body_matches_json_dumps_wherever_the_text_is_split(cut):
+    body = asyncio.run(collect(_content_body(pieces_of(TRICKY_TEXT, [cut]), 42)))
+
+    assert body == expected_body(TRICKY_TEXT, 42)
+
+
+def test_content_body_matches_json_dumps_one_character_per_piece():
+    body = asyncio.run(collect(_content_body(pieces_of(TRICKY_TEXT, range(1, len(TRICKY_TEXT))), 7)))
+
+    assert body == expected_body(TRICKY_TEXT, 7)
+
+
+def test_content_body_of_empty_content():
+    assert asyncio.run(collect(_content_body(pieces_of("", []), 0))) == expected_body("", 0)
+
+
+def test_memory_and_file_text_give_the_same_body(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "UPLOAD_CHUNK_CHARS", 3)
+    content = TRICKY_TEXT * 5
+    path = tmp_path / "content.txt"
+    path.write_bytes(content.encode("utf-8"))
+
+    from_memory = asyncio.run(collect(_content_body(_memory_text(content), 9)))
+    from_file = asyncio.run(collect(_content_body(_file_text(str(path)), 9)))
+
+    assert from_memory == from_file == expected_body(content, 9)
+
+
+class FakeResponse:
+    def __init__(self, status: int, headers=None):
+        self.status = status
+        self.headers = headers or {}
+
+    def raise_for_status(self) -> None:
+        if self.status >= 400:
+            raise aiohttp.ClientError(f"HTTP {self.status}")
+
+
+class FakeSession:
+    """Answers PATCHes from a script of responses and records what was sent."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def patch(self, url, headers, data):
+        session = self
+
+        class Request:
+            async def __aenter__(self):
+                body = data if isinstance(data, bytes) else await collect(data)
+                session.requests.append((dict(headers), body))
+                return session.responses.pop(0)
+
+            async def __aexit__(self, *exc_info):
+                return False
+
+        return Request()
+
+
+@pytest.fixture
+def session(monkeypatch):
+    monkeypatch.setattr(api_client, "accepts_gzip", None)
+    monkeypatch.setattr(api_client, "gzip_rejected", False)
+    monkeypatch.setattr(config, "UPLOAD_GZIP", "auto")
+    monkeypatch.setattr(config, "UPLOAD_GZIP_MIN_BYTES", 0)
+    monkeypatch.setattr(config, "UPLOAD_CHUNK_CHARS", 1000)
+    session = FakeSession([])
+
+    async def get_session():
+        return session
+
+    monkeypatch.setattr(api_client, "session", get_session)
+    return session
+
+
+def decoded(request) -> bytes:
+    headers, body = request
+    if headers.get("Content-Encoding") == "gzip":
+        return gzip.decompress(body)
+    return body
+
+
+@pytest.mark.parametrize("streamed", [False, True])
+def test_gzip_upload_sends_valid_gzip(session, monkeypatch, streamed):
+    monkeypatch.setattr(config, "UPLOAD_STREAM_THRESHOLD_CHARS", 0 if streamed else 10 ** 9)
+    api_client.accepts_gzip = True
+    content = TRICKY_TEXT * 500
+    session.responses.append(FakeResponse(200))
+
+    asyncio.run(update_asset_content("asset-1", content, token_count=5))
+
+    [request] = session.requests
+    assert request[0]["Content-Encoding"] == "gzip"
+    assert request[1][:2] == b"\x1f\x8b"
+    assert len(request[1]) < len(expected_body(content, 5))
+    assert decoded(request) == expected_body(content, 5)
+
+
+def test_streamed_file_upload_sends_valid_gzip(session, tmp_path):
+    api_client.accepts_gzip = True
+    content = TRICKY_TEXT * 500
+    path = tmp_path / "content.txt"
+    path.write_bytes(content.encode("utf-8"))
+    session.responses.append(FakeResponse(200))
+
+    asyncio.run(update_asset_content_file("asset-1", str(path), 5))
+
+    [request] = session.requests
+    assert request[0]["Content-Encoding"] == "gzip"
+    assert decoded(request) == expected_body(content, 5)
+
+
+def test_upload_is_plain_until_the_api_advertises_gzip(session):
+    session.responses += [FakeResponse(200, {"Accept-Encoding": "gzip, br"}), FakeResponse(200)]
+
+    asyncio.run(update_asset_content("asset-1", "first", token_count=1))
+    asyncio.run(update_asset_content("asset-1", "second", token_count=1))
+
+    assert [headers.get("Content-Encoding") for headers, _ in session.requests] == [None, "gzip"]
+
+
+@pytest.mark.parametrize("mode", ["auto", "always"])
+def test_415_resends_plain_and_stops_gzipping(session, monkeypatch, mode):
+    monkeypatch.setattr(config, "UPLOAD_GZIP", mode)
+    api_client.accepts_gzip = True
+    session.responses += [
+        FakeResponse(415),
+        # The plain retry still advertises gzip, which must not switch it back on.
+        FakeResponse(200, {"Accept-Encoding": "gzip"}),
+        FakeResponse(200, {"Accept-Encoding": "gzip"}),
+    ]
+
+    asyncio.run(update_asset_content("asset-1", "first", token_count=1))
+    asyncio.run(update_asset_content("asset-1", "second", token_count=2))
+
+    encodings = [headers.get("Content-Encoding") for headers, _ in session.requests]
+    assert encodings == ["gzip", None, None]
+    assert [decoded(request) for request in session.requests] == [
+        expected_body("first", 1),
+        expected_body("first", 1),
+        expected_body("second", 2),
+    ]
+    assert api_client.accepts_gzip is False
+
+
+def test_415_to_a_plain_body_is_an_error(session):
+    session.responses.append(FakeResponse(415))
+
+    with pytest.raises(api_client_module.ApiError):
+        asyncio.run(update_asset_content("asset-1", "first", token_count=1))
+    assert len(session.requests) == 1
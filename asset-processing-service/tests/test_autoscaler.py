@@ -0,0 +1,278 @@
+import asyncio
+from datetime import datetime
+import pytest
+from asset_processing_service import autoscaler as autoscaler_module
+from asset_processing_service.autoscaler import Autoscaler, WorkerPool
+from asset_processing_service.config import Config
+from asset_processing_service.models import AssetProcessingJob
+from asset_processing_service.scheduler import JobScheduler
+
+GB = 1024 ** 3
+JOB_MEMORY = GB // 2
+LIMIT = 10 * GB  # 8 GB usable at the default 0.8 target.
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def autoscale_config(monkeypatch):
+    monkeypatch.setattr(Config, "AUTOSCALE_MEMORY_TARGET", 0.8)
+    monkeypatch.setattr(Config, "AUTOSCALE_MAX_LOAD_PER_CPU", 1.5)
+    monkeypatch.setattr(Config, "AUTOSCALE_SCALE_DOWN_DELAY_SECONDS", 60)
+    monkeypatch.setattr(Config, "AUTOSCALE_JOB_MEMORY_BYTES", JOB_MEMORY)
+
+
+def make_job(job_id: str) -> AssetProcessingJob:
+    now = datetime.now()
+    return AssetProcessingJob(
+        id=job_id,
+        assetId=f"asset-{job_id}",
+        status="created",
+        attempts=0,
+        createdAt=now,
+        updatedAt=now,
+        lastHeartBeat=now,
+    )
+
+
+def make_autoscaler(min_workers: int = 1, max_workers: int = 8, clock=None) -> Autoscaler:
+    return Autoscaler(
+        pool=None,
+        job_queue=None,
+        min_workers=min_workers,
+        max_workers=max_workers,
+        clock=clock or FakeClock(),
+    )
+
+
+def test_memory_pressure_scales_down_at_once():
+    autoscaler = make_autoscaler()
+
+    # 0.5 GB left under the target fits one more job beside the four running.
+    target, reason = autoscaler.decide(current=8, busy=4, queued=10, used=int(7.5 * GB), limit=LIMIT, load_per_cpu=0.1)
+
+    assert (target, reason) == (5, "memory pressure")
+
+
+def test_memory_pressure_never_goes_below_the_minimum():
+    autoscaler = make_autoscaler(min_workers=2)
+
+    target, reason = autoscaler.decide(current=4, busy=0, queued=0, used=LIMIT, limit=LIMIT, load_per_cpu=0.1)
+
+    assert (target, reason) == (2, "memory pressure")
+
+
+def test_scale_up_follows_demand_within_memory():
+    autoscaler = make_autoscaler()
+
+    assert autoscaler.decide(current=2, busy=2, queued=3, used=GB, limit=LIMIT, load_per_cpu=0.1) == (5, "demand above capacity")
+    # Headroom for two more jobs caps the target below demand.
+    assert autoscaler.decide(current=2, busy=2, queued=3, used=7 * GB, limit=LIMIT, load_per_cpu=0.1) == (4, "demand above capacity")
+
+
+def test_scale_up_blocked_by_memory():
+    autoscaler = make_autoscaler()
+
+    target, reason = autoscaler.decide(current=2, busy=2, queued=3, used=int(7.9 * GB), limit=LIMIT, load_per_cpu=0.1)
+
+    assert (target, reason) == (2, "scale-up blocked by memory")
+
+
+def test_cpu_load_caps_scale_up():
+    autoscaler = make_autoscaler()
+
+    assert autoscaler.decide(current=2, busy=2, queued=3, used=GB, limit=LIMIT, load_per_cpu=1.5) == (2, "scale-up blocked by CPU load")
+    assert autoscaler.decide(current=2, busy=2, queued=3, used=GB, limit=LIMIT, load_per_cpu=1.4) == (5, "demand above capacity")
+
+
+def test_scale_down_waits_for_the_delay():
+    clock = FakeClock()
+    autoscaler = make_autoscaler(clock=clock)
+
+    assert autoscaler.decide(current=4, busy=1, queued=0, used=GB, limit=LIMIT, load_per_cpu=0.1) == (4, "waiting to scale down")
+    clock.now = 59
+    assert autoscaler.decide(current=4, busy=1, queued=0, used=GB, limit=LIMIT, load_per_cpu=0.1) == (4, "waiting to scale down")
+    clock.now = 60
+    assert autoscaler.decide(current=4, busy=1, queued=0, used=GB, limit=LIMIT, load_per_cpu=0.1) == (1, "demand below capacity")
+
+
+def test_demand_returning_restarts_the_scale_down_delay():
+    clock = FakeClock()
+    autoscaler = make_autoscaler(clock=clock)
+
+    autoscaler.decide(current=4, busy=1, queued=0, used=GB, limit=LIMIT, load_per_cpu=0.1)
+    clock.now = 50
+    assert autoscaler.decide(current=4, busy=4, queued=0, used=GB, limit=LIMIT, load_per_cpu=0.1) == (4, "steady")
+    clock.now = 70
+    assert autoscaler.decide(current=4, busy=1, queued=0, used=GB, limit=LIMIT, load_per_cpu=0.1) == (4, "waiting to scale down")
+    clock.now = 130
+    assert autoscaler.decide(current=4, busy=1, queued=0, used=GB, limit=LIMIT, load_per_cpu=0.1) == (1, "demand below capacity")
+
+
+def test_target_is_clamped_to_min_and_max():
+    clock = FakeClock()
+    autoscaler = make_autoscaler(min_workers=2, max_workers=6, clock=clock)
+
+    assert autoscaler.decide(current=6, busy=6, queued=50, used=GB, limit=LIMIT, load_per_cpu=0.1) == (6, "steady")
+    assert autoscaler.decide(current=3, busy=3, queued=50, used=GB, limit=LIMIT, load_per_cpu=0.1) == (6, "demand above capacity")
+
+    autoscaler.decide(current=3, busy=0, queued=0, used=GB, limit=LIMIT, load_per_cpu=0.1)
+    clock.now = 60
+    assert autoscaler.decide(current=3, busy=0, queued=0, used=GB, limit=LIMIT, load_per_cpu=0.1) == (2, "demand below capacity")
+
+
+def test_min_and_max_are_sanitised():
+    autoscaler = make_autoscaler(min_workers=0, max_workers=0)
+
+    assert (autoscaler.min_workers, autoscaler.max_workers) == (1, 1)
+
+
+def test_unknown_memory_limit_does_not_block_scale_up():
+    autoscaler = make_autoscaler()
+
+    assert autoscaler.decide(current=1, busy=1, queued=2, used=0, limit=0, load_per_cpu=0.1) == (3, "demand above capacity")
+
+
+def test_per_job_memory_follows_what_running_jobs_use():
+    autoscaler = make_autoscaler()
+
+    autoscaler.observe_memory(used=GB, busy=0)
+    for _ in range(30):
+        autoscaler.observe_memory(used=3 * GB, busy=2)
+
+    assert autoscaler.job_memory_bytes == pytest.approx(GB, rel=0.01)
+
+
+class FakeWorkers:
+    """Workers that take a future from `jobs` and stay busy until it is resolved."""
+
+    def __init__(self):
+        self.jobs: asyncio.Queue = asyncio.Queue()
+        self.pool = WorkerPool(self.run)
+        self.cancelled = []
+        self.finished = []
+        self.exited = []
+
+    async def run(self, worker_id: int) -> None:
+        try:
+            while not self.pool.should_retire(worker_id):
+                self.pool.mark_idle(worker_id)
+                job = await self.jobs.get()
+                self.pool.mark_busy(worker_id)
+                await job
+                self.finished.append(worker_id)
+            self.exited.append(worker_id)
+        except asyncio.CancelledError:
+            self.cancelled.append(worker_id)
+            raise
+
+    async def start_jobs(self, count: int):
+        jobs = [asyncio.get_running_loop().create_future() for _ in range(count)]
+        for job in jobs:
+            self.jobs.put_nowait(job)
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return jobs
+
+
+def test_resize_starts_and_cancels_idle_workers():
+    async def scenario():
+        workers = FakeWorkers()
+        workers.pool.resize(3)
+        await asyncio.sleep(0)
+        assert (workers.pool.size, workers.pool.busy) == (3, 0)
+
+        workers.pool.resize(1)
+        await asyncio.sleep(0)
+        assert workers.pool.size == 1
+        assert sorted(workers.cancelled) == [1, 2]
+        await workers.pool.stop()
+
+    asyncio.run(scenario())
+
+
+def test_resize_retires_busy_workers_without_cancelling_them():
+    async def scenario():
+        workers = FakeWorkers()
+        workers.pool.resize(3)
+        await asyncio.sleep(0)
+        jobs = await workers.start_jobs(2)
+        assert workers.pool.busy == 2
+
+        workers.pool.resize(0)
+        await asyncio.sleep(0)
+        # The idle worker goes at once. The busy ones keep their jobs.
+        assert workers.cancelled == [3]
+        assert workers.pool.size == 0
+        assert workers.pool.busy == 2
+
+        for job in jobs:
+            job.set_result(None)
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert sorted(workers.finished) == [1, 2]
+        assert sorted(workers.exited) == [1, 2]
+        assert workers.cancelled == [3]
+        assert workers.pool.busy == 0
+
+    asyncio.run(scenario())
+
+
+def test_resize_up_keeps_a_retiring_worker_instead_of_starting_one():
+    async def scenario():
+        workers = FakeWorkers()
+        workers.pool.resize(1)
+        await asyncio.sleep(0)
+        jobs = await workers.start_jobs(1)
+
+        workers.pool.resize(0)
+        assert workers.pool.should_retire(1)
+        workers.pool.resize(1)
+        assert not workers.pool.should_retire(1)
+        assert workers.pool.size == 1
+
+        jobs[0].set_result(None)
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert workers.exited == []
+        assert workers.pool.busy == 0
+        await workers.pool.stop()
+
+    asyncio.run(scenario())
+
+
+def test_step_resizes_the_pool_from_injected_readings(monkeypatch):
+    async def scenario():
+        readings = {"memory": (GB, LIMIT), "load": 0.1}
+        monkeypatch.setattr(autoscaler_module, "read_memory", lambda: readings["memory"])
+        monkeypatch.setattr(autoscaler_module, "read_load_per_cpu", lambda: readings["load"])
+        workers = FakeWorkers()
+        job_queue = JobScheduler()
+        autoscaler = Autoscaler(workers.pool, job_queue, min_workers=1, max_workers=4)
+        workers.pool.resize(1)
+        await asyncio.sleep(0)
+        for index in range(3):
+            job_queue.put_nowait(make_job(f"job-{index}"))
+
+        readings["load"] = 2.0
+        autoscaler.step()
+        assert workers.pool.size == 1
+
+        readings["load"] = 0.1
+        autoscaler.step()
+        assert workers.pool.size == 3
+
+        readings["memory"] = (LIMIT, LIMIT)
+        autoscaler.step()
+        await asyncio.sleep(0)
+        assert workers.pool.size == 1
+        await workers.pool.stop()
+
+    asyncio.run(scenario())
+
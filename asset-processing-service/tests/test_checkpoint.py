@@ -0,0 +1,53 @@
+import asyncio
+import os
+import pytest
+from asset_processing_service.checkpoint import JobCheckpoint
+from asset_processing_service.config import Config
+
+
+@pytest.fixture(autouse=True)
+def work_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "WORK_DIR", str(tmp_path))
+    return tmp_path
+
+
+def save_chunks(checkpoint: JobCheckpoint, records) -> None:
+    async def save():
+        for index, (sha256, text) in enumerate(records):
+            await checkpoint.save_chunk_transcript(index, sha256, text, len(text))
+
+    asyncio.run(save())
+
+
+def test_chunk_transcripts_survive_a_reload():
+    checkpoint = JobCheckpoint.load("job-1", "asset-1")
+    checkpoint.mark_done("download", size=10, sha256="input")
+    save_chunks(checkpoint, [("sha-0", "first"), ("sha-1", "second")])
+
+    resumed = JobCheckpoint.load("job-1", "asset-1")
+
+    assert resumed.get("download") == {"size": 10, "sha256": "input"}
+    assert resumed.chunk_transcript(1, "sha-1") == {"sha256": "sha-1", "text": "second", "token_count": 6}
+    assert "chunks" not in resumed.state
+
+
+def test_chunk_transcript_is_not_reused_for_different_segment():
+    checkpoint = JobCheckpoint.load("job-1", "asset-1")
+    checkpoint.mark_done("download", size=10, sha256="input")
+    save_chunks(checkpoint, [("sha-0", "first")])
+
+    resumed = JobCheckpoint.load("job-1", "asset-1")
+
+    assert resumed.chunk_transcript(0, "re-cut-segment") is None
+    assert resumed.chunk_transcript(1, "sha-0") is None
+
+
+def test_chunk_transcripts_are_cleared_for_another_asset():
+    checkpoint = JobCheckpoint.load("job-1", "asset-1")
+    checkpoint.mark_done("download", size=10, sha256="input")
+    save_chunks(checkpoint, [("sha-0", "first")])
+
+    other = JobCheckpoint.load("job-1", "asset-2")
+
+    assert other.chunk_transcript(0, "sha-0") is None
+    assert not os.path.exists(other.chunks_dir)
@@ -0,0 +1,153 @@
+import asyncio
+import pytest
+from asset_processing_service import job_updater as job_updater_module
+from asset_processing_service.job_updater import JobUpdateBuffer
+
+
+class StubApi:
+    """Records every PATCH in order and tracks how many are in flight per job."""
+
+    def __init__(self, latency_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+        self.calls = []
+        self.in_flight = {}
+        self.overlaps = []
+
+    async def _send(self, job_id, update_data):
+        if self.in_flight.get(job_id):
+            self.overlaps.append(job_id)
+        self.in_flight[job_id] = self.in_flight.get(job_id, 0) + 1
+        try:
+            await asyncio.sleep(self.latency_seconds)
+            self.calls.append((job_id, update_data))
+        finally:
+            self.in_flight[job_id] -= 1
+
+    async def update_job_details(self, job_id, update_data):
+        await self._send(job_id, dict(update_data))
+
+    async def update_job_heartbeat(self, job_id):
+        await self._send(job_id, None)
+
+
+@pytest.fixture
+def api(monkeypatch):
+    api = StubApi()
+    monkeypatch.setattr(job_updater_module, "update_job_details", api.update_job_details)
+    monkeypatch.setattr(job_updater_module, "update_job_heartbeat", api.update_job_heartbeat)
+    return api
+
+
+def make_buffer(batch_size: int = 10) -> JobUpdateBuffer:
+    return JobUpdateBuffer(flush_interval_seconds=60, batch_size=batch_size, heartbeat_interval_seconds=60)
+
+
+def test_heartbeat_rides_along_with_pending_update(api):
+    buffer = make_buffer()
+    buffer.update("job-1", {"status": "in_progress", "attempts": 1})
+    buffer.heartbeat("job-1")
+
+    asyncio.run(buffer.flush())
+
+    assert api.calls == [("job-1", {"status": "in_progress", "attempts": 1})]
+
+
+def test_heartbeat_alone_is_sent_as_heartbeat(api):
+    buffer = make_buffer()
+    buffer.heartbeat("job-1")
+    buffer.heartbeat("job-1")
+
+    asyncio.run(buffer.flush())
+
+    assert api.calls == [("job-1", None)]
+
+
+def test_repeated_status_is_coalesced(api):
+    buffer = make_buffer()
+    buffer.heartbeat("job-1")
+    buffer.update("job-1", {"status": "in_progress", "attempts": 1})
+    buffer.update("job-1", {"status": "in_progress", "error_message": "retrying"})
+    buffer.update("job-1", {"attempts": 2})
+
+    asyncio.run(buffer.flush())
+
+    assert api.calls == [("job-1", {"status": "in_progress", "attempts": 2, "error_message": "retrying"})]
+
+
+def test_distinct_transitions_are_sent_in_order(api):
+    buffer = make_buffer()
+    buffer.update("job-1", {"status": "in_progress", "attempts": 1})
+    buffer.update("job-2", {"status": "in_progress", "attempts": 1})
+    buffer.update("job-1", {"status": "failed", "attempts": 1})
+    buffer.update("job-1", {"status": "in_progress", "attempts": 2})
+    buffer.update("job-1", {"status": "completed"})
+
+    asyncio.run(buffer.flush())
+
+    statuses = [update["status"] for job_id, update in api.calls if job_id == "job-1"]
+    assert statuses == ["in_progress", "failed", "in_progress", "completed"]
+    assert ("job-2", {"status": "in_progress", "attempts": 1}) in api.calls
+    assert buffer.pending_count() == 0
+
+
+def test_flush_sends_in_batches(api):
+    buffer = make_buffer(batch_size=2)
+    for index in range(5):
+        buffer.update(f"job-{index}", {"status": "in_progress"})
+
+    asyncio.run(buffer.flush())
+
+    assert sorted(job_id for job_id, _ in api.calls) == [f"job-{index}" for index in range(5)]
+
+
+def test_flush_waits_for_updates_drain_is_sending(api):
+    api.latency_seconds = 0.1
+    buffer = make_buffer()
+
+    async def scenario():
+        buffer.update("job-1", {"status": "in_progress", "attempts": 1})
+        drain = asyncio.create_task(buffer.drain("job-1"))
+        await asyncio.sleep(0.01)
+        assert buffer.has_pending("job-1")
+        buffer.update("job-1", {"status": "completed"})
+        buffer.update("job-2", {"status": "in_progress"})
+        await asyncio.gather(drain, buffer.flush())
+
+    asyncio.run(scenario())
+
+    assert api.overlaps == []
+    statuses = [update["status"] for job_id, update in api.calls if job_id == "job-1"]
+    assert statuses == ["in_progress", "completed"]
+    assert not buffer.has_pending("job-1")
+
+
+def test_failed_send_does_not_block_other_jobs(api, monkeypatch):
+    async def update_job_details(job_id, update_data):
+        if job_id == "job-1":
+            raise RuntimeError("boom")
+        await api.update_job_details(job_id, update_data)
+
+    monkeypatch.setattr(job_updater_module, "update_job_details", update_job_details)
+    buffer = make_buffer()
+    buffer.update("job-1", {"status": "completed"})
+    buffer.update("job-2", {"status": "completed"})
+
+    asyncio.run(buffer.flush())
+
+    assert api.calls == [("job-2", {"status": "completed"})]
+    assert not buffer.has_pending("job-1")
+
+
+def test_stop_delivers_everything_queued(api):
+    buffer = make_buffer()
+
+    async def scenario():
+        buffer.start()
+        buffer.track("job-1")
+        buffer.update("job-1", {"status": "completed"})
+        buffer.untrack("job-1")
+        await buffer.stop()
+
+    asyncio.run(scenario())
+
+    assert api.calls == [("job-1", {"status": "completed"})]
@@ -0,0 +1,200 @@
+import asyncio
+import os
+import subprocess
+import sys
+from datetime import datetime
+import pytest
+from asset_processing_service.models import Asset, AssetProcessingJob
+from asset_processing_service.scheduler import (
+    BASE_COST_SECONDS,
+    DEFAULT_COST_SECONDS_PER_MB,
+    JobScheduler,
+    estimate_cost_seconds,
+)
+
+MB = 1024 * 1024
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_job(job_id: str) -> AssetProcessingJob:
+    now = datetime.now()
+    return AssetProcessingJob(
+        id=job_id,
+        assetId=f"asset-{job_id}",
+        status="created",
+        attempts=0,
+        createdAt=now,
+        updatedAt=now,
+        lastHeartBeat=now,
+    )
+
+
+def make_asset(
+        file_type: str = "video",
+        mime_type: str = "video/mp4",
+        size: int = MB,
+        project_id: str = "project-1") -> Asset:
+    return Asset(
+        id="asset",
+        projectId=project_id,
+        title="asset",
+        fileName="asset",
+        fileUrl="https://example.com/asset",
+        fileType=file_type,
+        mimeType=mime_type,
+        size=size,
+    )
+
+
+def make_scheduler(clock: FakeClock, **kwargs) -> JobScheduler:
+    kwargs.setdefault("aging_weight", 0)
+    kwargs.setdefault("max_wait_seconds", 30 * 60)
+    kwargs.setdefault("fair_share_weight", 0)
+    return JobScheduler(clock=clock, **kwargs)
+
+
+def next_job_id(scheduler: JobScheduler) -> str:
+    job, _ = scheduler.get_nowait()
+    return job.id
+
+
+@pytest.mark.parametrize(
+    "file_type, mime_type, per_mb",
+    [
+        ("video", "video/mp4", 1.0),
+        ("audio", "audio/mpeg", 1.5),
+        ("text", "text/plain", 0.02),
+        ("markdown", "text/markdown", 0.02),
+        ("text/plain", "text/plain", 0.02),
+        ("text/markdown", "text/markdown", 0.02),
+        # Unknown fileType: fall back to the MIME type's wildcard.
+        ("mp4", "video/mp4", 1.0),
+        ("mp3", "audio/mpeg", 1.5),
+        ("md", "text/markdown; charset=utf-8", 0.02),
+        ("TXT", "TEXT/PLAIN", 0.02),
+        ("pdf", "application/pdf", DEFAULT_COST_SECONDS_PER_MB),
+    ],
+)
+def test_cost_per_mb_by_asset_type(file_type, mime_type, per_mb):
+    asset = make_asset(file_type, mime_type, size=10 * MB)
+
+    assert estimate_cost_seconds(asset) == pytest.approx(BASE_COST_SECONDS + 10 * per_mb)
+
+
+def test_cost_without_an_asset_is_the_base_cost():
+    assert estimate_cost_seconds(None) == BASE_COST_SECONDS
+
+
+def test_cheapest_job_goes_first():
+    scheduler = make_scheduler(FakeClock())
+    scheduler.put_nowait(make_job("video"), make_asset("video", "video/mp4", 50 * MB))
+    scheduler.put_nowait(make_job("text"), make_asset("text", "text/plain", 50 * MB))
+    scheduler.put_nowait(make_job("audio"), make_asset("audio", "audio/mpeg", 50 * MB))
+
+    assert [next_job_id(scheduler) for _ in range(3)] == ["text", "video", "audio"]
+
+
+def test_equal_cost_jobs_go_in_arrival_order():
+    scheduler = make_scheduler(FakeClock())
+    for job_id in ["a", "b", "c"]:
+        scheduler.put_nowait(make_job(job_id), make_asset())
+
+    assert [next_job_id(scheduler) for _ in range(3)] == ["a", "b", "c"]
+
+
+def test_aging_lets_a_waiting_job_overtake_a_cheaper_one():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock, aging_weight=1)
+    scheduler.put_nowait(make_job("big"), make_asset(size=10 * MB))  # ~11s
+    clock.now = 20
+    scheduler.put_nowait(make_job("small"), make_asset("text", "text/plain", MB))  # ~1s
+
+    assert next_job_id(scheduler) == "big"
+
+
+def test_without_aging_the_cheaper_job_still_wins():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock, aging_weight=0)
+    scheduler.put_nowait(make_job("big"), make_asset(size=10 * MB))
+    clock.now = 20
+    scheduler.put_nowait(make_job("small"), make_asset("text", "text/plain", MB))
+
+    assert next_job_id(scheduler) == "small"
+
+
+def test_max_wait_puts_the_oldest_job_first():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock, max_wait_seconds=30)
+    scheduler.put_nowait(make_job("old-big"), make_asset(size=500 * MB))
+    clock.now = 5
+    scheduler.put_nowait(make_job("newer-big"), make_asset(size=500 * MB))
+    scheduler.put_nowait(make_job("small"), make_asset("text", "text/plain", MB))
+
+    clock.now = 29
+    assert next_job_id(scheduler) == "small"
+
+    clock.now = 40
+    assert [next_job_id(scheduler) for _ in range(2)] == ["old-big", "newer-big"]
+
+
+def test_max_wait_seconds_can_be_set_from_the_environment():
+    env = dict(os.environ, SCHEDULER_MAX_WAIT_SECONDS="5")
+    service_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [service_dir, env.get("PYTHONPATH")]))
+    output = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "from asset_processing_service.scheduler import JobScheduler; print(JobScheduler().max_wait_seconds)",
+        ],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+
+    assert float(output.strip()) == 5
+
+
+def test_fair_share_favours_projects_with_fewer_running_jobs():
+    scheduler = make_scheduler(FakeClock(), fair_share_weight=1)
+    scheduler.put_nowait(make_job("busy-1"), make_asset(project_id="busy"))
+    scheduler.put_nowait(make_job("busy-2"), make_asset(project_id="busy"))
+    scheduler.put_nowait(make_job("quiet-1"), make_asset(project_id="quiet"))
+
+    running, _ = scheduler.get_nowait()
+    assert running.id == "busy-1"
+    assert scheduler.stats()["running_by_project"] == {"busy": 1}
+
+    # busy-2 arrived first but its project already has a job running.
+    assert next_job_id(scheduler) == "quiet-1"
+
+
+def test_task_done_releases_the_fair_share_slot():
+    scheduler = make_scheduler(FakeClock(), fair_share_weight=1)
+    scheduler.put_nowait(make_job("busy-1"), make_asset(project_id="busy"))
+    running, _ = scheduler.get_nowait()
+    scheduler.put_nowait(make_job("busy-2"), make_asset(project_id="busy"))
+    scheduler.put_nowait(make_job("quiet-1"), make_asset(project_id="quiet"))
+
+    scheduler.task_done(running)
+    scheduler.task_done(running)  # A second call is a no-op.
+
+    assert scheduler.stats()["running_by_project"] == {}
+    assert next_job_id(scheduler) == "busy-2"
+
+
+def test_put_nowait_respects_maxsize():
+    scheduler = make_scheduler(FakeClock(), maxsize=1)
+    scheduler.put_nowait(make_job("a"), make_asset())
+
+    assert scheduler.full()
+    with pytest.raises(asyncio.QueueFull):
+        scheduler.put_nowait(make_job("b"), make_asset())
@@ -0,0 +1,166 @@
+import asyncio
+import hashlib
+import os
+import pytest
+from asset_processing_service.config import Config
+from asset_processing_service.token_counter import (
+    JOIN_WINDOW_CHARS,
+    TokenCounter,
+    TokenTally,
+    _boundary_cuts,
+    _is_cut_point,
+    _last_cut_point,
+)
+
+regex = pytest.importorskip("regex")
+
+# The o200k_base pre-tokenizer pattern (tiktoken_ext.openai_public.o200k_base).
+# BPE merges never cross pre-token boundaries, so this pattern alone decides
+# whether counts add up across a cut.
+O200K_PAT_STR = "|".join(
+    [
+        r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]*[\p{Ll}\p{Lm}\p{Lo}\p{M}]+(?i:'s|'t|'re|'ve|'m|'ll|'d)?""",
+        r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]+[\p{Ll}\p{Lm}\p{Lo}\p{M}]*(?i:'s|'t|'re|'ve|'m|'ll|'d)?""",
+        r"""\p{N}{1,3}""",
+        r""" ?[^\s\p{L}\p{N}]+[\r\n/]*""",
+        r"""\s*[\r\n]+""",
+        r"""\s+(?!\S)""",
+        r"""\s+""",
+    ]
+)
+PRE_TOKEN_PATTERN = regex.compile(O200K_PAT_STR)
+
+
+def pre_tokens(text: str) -> list:
+    return PRE_TOKEN_PATTERN.findall(text)
+
+
+class PreTokenEncoding:
+    """
+        Stand-in for a BPE encoding that needs no data file: every pre-token
+        becomes a number of tokens that depends on its bytes, the way BPE
+        merges do, but nothing is merged across pre-tokens.
+    """
+
+    def encode_ordinary(self, text: str) -> list:
+        tokens = []
+        for piece in pre_tokens(text):
+            data = piece.encode("utf-8")
+            tokens.extend(range(1 + len(data) // 3 + data.count(b" ") % 2))
+        return tokens
+
+
+def bpe_cached() -> bool:
+    """Whether the model's BPE file is already in TIKTOKEN_CACHE_DIR, so no download is needed."""
+    try:
+        from tiktoken.model import encoding_name_for_model
+    except ImportError:
+        return False
+
+    name = encoding_name_for_model(Config.TOKEN_COUNT_MODEL)
+    url = f"https://openaipublic.blob.core.windows.net/encodings/{name}.tiktoken"
+    return os.path.exists(os.path.join(Config.TIKTOKEN_CACHE_DIR, hashlib.sha1(url.encode()).hexdigest()))
+
+
+LONG = "The campaign brief goes out to every channel partner this week. " * 4
+
+JOINS = [
+    ["Hello world.", "How are you?"],
+    ["   ", "text", "\n\n", " more text"],
+    ["", "only", ""],
+    [" ", " ", " "],
+    ["word ", " word", "word\t", "\tword"],
+    ["a" * 300, "b" * 300, "c" * 300],
+    ["nospaceshere" * 20, "eitherside" * 20],
+    ["Total: 1234", "5678 units", "9"],
+    ["1234567890" * 30, "0987654321" * 30],
+    ["id 1234567890" * 8, "9876543210 ok" * 8],
+    [LONG + "costs 100", "200" + LONG, "300"],
+    [LONG + "end.", ".start" + LONG, "!!!", "?" + LONG],
+    [LONG + "quote \"", "'s" + LONG, "'ll do it"],
+    [LONG + "café", "été " + LONG, "日本語のテキスト", "テキスト" + LONG],
+    [LONG + "\n", "\n" + LONG, "\r\n", LONG],
+    ["x" * (JOIN_WINDOW_CHARS - 1) + " y", "z " + "w" * (JOIN_WINDOW_CHARS - 1)],
+]
+
+
+@pytest.fixture(scope="module", params=["pre_tokens", "bpe"])
+def counter(request):
+    """The offline pre-token encoding always; the model's real BPE when its file is cached."""
+    if request.param == "bpe" and not bpe_cached():
+        pytest.skip("tokenizer BPE file is not cached")
+    counter = TokenCounter(Config.TOKEN_COUNT_MODEL, max_workers=1)
+    if request.param == "pre_tokens":
+        counter._encoding = PreTokenEncoding()
+    yield counter
+    counter.shutdown()
+
+
+def full_count(counter: TokenCounter, text: str) -> int:
+    return len(counter.load().encode_ordinary(text))
+
+
+@pytest.mark.parametrize("separator", ["\n", " ", "", "\n\n"])
+@pytest.mark.parametrize("texts", JOINS)
+def test_count_joined_matches_full_count(counter, texts, separator):
+    counts = [counter.count_sync(text) for text in texts]
+
+    joined = asyncio.run(counter.count_joined(texts, counts, separator=separator))
+
+    assert joined == full_count(counter, separator.join(texts))
+
+
+@pytest.mark.parametrize("piece_size", [1, 2, 7, 64, 1000])
+@pytest.mark.parametrize("texts", JOINS)
+def test_token_tally_matches_full_count(counter, texts, piece_size):
+    text = "\n".join(texts)
+
+    async def tally_pieces() -> int:
+        tally = TokenTally(counter)
+        for start in range(0, len(text), piece_size):
+            await tally.add(text[start:start + piece_size])
+        return await tally.finish()
+
+    assert asyncio.run(tally_pieces()) == full_count(counter, text)
+
+
+@pytest.mark.parametrize("texts", JOINS)
+def test_token_tally_matches_full_count_for_uneven_pieces(counter, texts):
+    async def tally_pieces() -> int:
+        tally = TokenTally(counter)
+        for text in texts:
+            await tally.add(text)
+        return await tally.finish()
+
+    assert asyncio.run(tally_pieces()) == full_count(counter, "".join(texts))
+
+
+def joined_variants():
+    for texts in JOINS:
+        for separator in ["\n", " ", ""]:
+            yield separator.join(texts)
+
+
+@pytest.mark.parametrize("text", list(joined_variants()))
+def test_cut_points_do_not_change_pre_tokens(text):
+    for index in range(len(text)):
+        if _is_cut_point(text, index):
+            assert pre_tokens(text[:index]) + pre_tokens(text[index:]) == pre_tokens(text), index
+
+
+@pytest.mark.parametrize("text", list(joined_variants()))
+def test_boundary_cuts_are_cut_points_near_the_ends(text):
+    cuts = _boundary_cuts(text)
+    if cuts is None:
+        return
+    head, tail = cuts
+    assert _is_cut_point(text, head) and _is_cut_point(text, tail)
+    assert head <= JOIN_WINDOW_CHARS and tail >= len(text) - JOIN_WINDOW_CHARS
+    assert head <= tail
+
+
+@pytest.mark.parametrize("text", list(joined_variants()))
+def test_last_cut_point_is_the_last_one(text):
+    cut = _last_cut_point(text)
+    cut_points = [index for index in range(len(text)) if _is_cut_point(text, index)]
+    assert cut == (cut_points[-1] if cut_points else None)
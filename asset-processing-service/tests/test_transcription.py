@@ -0,0 +1,130 @@
+import asyncio
+import pytest
+from asset_processing_service.transcription import (
+    FakeTranscriptionBackend,
+    RetryableTranscriptionError,
+    TranscriptionBackend,
+    TranscriptionEngine,
+)
+
+
+class FlakyBackend(TranscriptionBackend):
+    """Fails the first `failures` calls with a retryable error, then succeeds."""
+
+    def __init__(self, failures: int, retry_after=None):
+        self.failures = failures
+        self.retry_after = retry_after
+        self.calls = 0
+        self.call_times = []
+
+    async def transcribe(self, audio_path: str) -> str:
+        self.calls += 1
+        self.call_times.append(asyncio.get_running_loop().time())
+        if self.calls <= self.failures:
+            raise RetryableTranscriptionError("rate limited", retry_after=self.retry_after)
+        return "ok"
+
+
+def make_engine(backend: TranscriptionBackend, max_concurrency: int = 4, max_retries: int = 3) -> TranscriptionEngine:
+    return TranscriptionEngine(
+        backend,
+        max_concurrency=max_concurrency,
+        max_retries=max_retries,
+        backoff_base_seconds=0.001,
+        backoff_max_seconds=0.01,
+    )
+
+
+@pytest.fixture
+def audio_path(tmp_path):
+    path = tmp_path / "chunk_000.mp3"
+    path.write_bytes(b"\0" * 128)
+    return str(path)
+
+
+@pytest.mark.parametrize("max_concurrency", [1, 3, 8])
+def test_in_flight_requests_are_capped(audio_path, max_concurrency):
+    backend = FakeTranscriptionBackend(latency_seconds=0.02)
+    engine = make_engine(backend, max_concurrency=max_concurrency)
+
+    async def transcribe_all():
+        return await asyncio.gather(*(engine.transcribe(audio_path) for _ in range(20)))
+
+    texts = asyncio.run(transcribe_all())
+
+    assert backend.calls == 20
+    assert backend.peak_in_flight == max_concurrency
+    assert texts == ["Transcript of chunk_000.mp3 (128 bytes)."] * 20
+
+
+def test_retry_honours_retry_after(audio_path):
+    backend = FlakyBackend(failures=2, retry_after=0.1)
+    engine = make_engine(backend)
+
+    assert asyncio.run(engine.transcribe(audio_path)) == "ok"
+
+    assert backend.calls == 3
+    gaps = [later - earlier for earlier, later in zip(backend.call_times, backend.call_times[1:])]
+    assert all(gap >= 0.1 for gap in gaps)
+
+
+def test_backoff_never_shorter_than_retry_after():
+    engine = make_engine(FlakyBackend(failures=0))
+
+    for attempt in range(5):
+        assert engine._backoff_seconds(attempt, retry_after=5.0) >= 5.0
+        assert engine._backoff_seconds(attempt, retry_after=None) <= engine.backoff_max_seconds
+
+
+def test_gives_up_after_max_retries(audio_path):
+    backend = FlakyBackend(failures=100)
+    engine = make_engine(backend, max_retries=2)
+
+    with pytest.raises(RetryableTranscriptionError):
+        asyncio.run(engine.transcribe(audio_path))
+
+    assert backend.calls == 3
+
+
+def test_other_errors_are_not_retried(audio_path):
+    class BrokenBackend(TranscriptionBackend):
+        calls = 0
+
+        async def transcribe(self, audio_path: str) -> str:
+            self.calls += 1
+            raise ValueError("bad audio")
+
+    backend = BrokenBackend()
+    engine = make_engine(backend)
+
+    with pytest.raises(ValueError):
+        asyncio.run(engine.transcribe(audio_path))
+
+    assert backend.calls == 1
+
+
+def test_backoff_releases_the_slot(audio_path, tmp_path):
+    """A chunk waiting to retry must not hold its slot from other chunks."""
+
+    class RateLimitedPathBackend(TranscriptionBackend):
+        def __init__(self):
+            self.failed = False
+
+        async def transcribe(self, audio_path: str) -> str:
+            if audio_path.endswith("limited.mp3") and not self.failed:
+                self.failed = True
+                raise RetryableTranscriptionError("rate limited", retry_after=0.2)
+            return "ok"
+
+    engine = make_engine(RateLimitedPathBackend(), max_concurrency=1)
+
+    async def scenario():
+        retrying = asyncio.create_task(engine.transcribe(str(tmp_path / "limited.mp3")))
+        await asyncio.sleep(0.05)
+        started = asyncio.get_running_loop().time()
+        await engine.transcribe(audio_path)
+        finished_in = asyncio.get_running_loop().time() - started
+        await retrying
+        return finished_in
+
+    assert asyncio.run(scenario()) < 0.1
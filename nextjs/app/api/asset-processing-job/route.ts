@@ -1,6 +1,6 @@
 import { db } from "@/server/db";
 import { assetProcessingJobTable } from "@/server/db/schema/schema";
-import { eq, inArray, sql } from "drizzle-orm";
+import { asc, eq, inArray, sql } from "drizzle-orm";
 import { NextResponse } from "next/server";
 import { z } from "zod";
 
@@ -11,18 +11,33 @@ const updateAssetJobSchema = z.object({
         lastHeartBeat: z.string().optional(),    
 })
 
-export async function GET(){
+const NON_TERMINAL_STATUSES = ["created", "failed", "in_progress"];
+
+export async function GET(request: Request){
+    const { searchParams } = new URL(request.url);
+
+    // Optional filters so workers can ask for only as many jobs as they have capacity for
+    const statusParam = searchParams.get("status");
+    const statuses = statusParam
+        ? statusParam.split(",").filter((status) => NON_TERMINAL_STATUSES.includes(status))
+        : NON_TERMINAL_STATUSES;
+    if (statuses.length === 0) {
+        return NextResponse.json({ error: "Invalid status filter" }, { status: 400 });
+    }
+    const limitParam = searchParams.get("limit");
+    const limit = limitParam ? Number.parseInt(limitParam, 10) : undefined;
+    if (limit !== undefined && (Number.isNaN(limit) || limit < 1)) {
+        return NextResponse.json({ error: "Invalid limit" }, { status: 400 });
+    }
+
     const database = await db();
 
     try {
+        const query = database.drizzle.select().from(assetProcessingJobTable)
+        .where(inArray(assetProcessingJobTable.status, statuses))
+        .orderBy(asc(assetProcessingJobTable.createdAt));
 
-        const jobs = await database.drizzle.select().from(assetProcessingJobTable)
-        .where(inArray(assetProcessingJobTable.status,[
-            //non terminal states
-            "created",
-            "failed",
-            "in_progress",
-        ])).execute();
+        const jobs = limit !== undefined ? await query.limit(limit).execute() : await query.execute();
         return NextResponse.json( jobs , { status: 200 });
     } catch (error) {
         console.error("❌ Error fetching jobs:", error);
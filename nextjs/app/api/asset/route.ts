@@ -9,6 +9,18 @@ const updateAssetSchema = z.object({
     tokenCount: z.number(),
 })
 
+// Request body encodings PATCH can decode. Advertised on responses so the
+// processing service knows it may gzip large transcripts.
+const ACCEPTED_ENCODINGS = "gzip";
+
+async function readJsonBody(request: Request, encoding: string | null) {
+    if (encoding === "gzip" && request.body) {
+        const decompressed = request.body.pipeThrough(new DecompressionStream("gzip"));
+        return new Response(decompressed).json();
+    }
+    return request.json();
+}
+
 
 export async function GET(request: Request){
     const { searchParams } = new URL(request.url);
@@ -25,7 +37,7 @@ export async function GET(request: Request){
         if (asset.length === 0) {
             return NextResponse.json({ error: "Asset not found" }, { status: 404 });
         }
-        return NextResponse.json( asset[0] , { status: 200 });
+        return NextResponse.json( asset[0] , { status: 200, headers: { "Accept-Encoding": ACCEPTED_ENCODINGS } });
     } catch (error) {
         console.error("❌ Error fetching asset:", error);
         return NextResponse.json({ error: "Failed to fetch asset" }, { status: 500 });
@@ -42,7 +54,20 @@ export async function PATCH(request: Request){
     if (!assetId) {
         return NextResponse.json({ error: "Asset ID is required" }, { status: 400 });
     }
-    const body = await request.json();
+    const encoding = request.headers.get("content-encoding")?.toLowerCase() ?? null;
+    if (encoding && encoding !== "identity" && encoding !== ACCEPTED_ENCODINGS) {
+        return NextResponse.json(
+            { error: `Unsupported content encoding: ${encoding}` },
+            { status: 415, headers: { "Accept-Encoding": ACCEPTED_ENCODINGS } },
+        );
+    }
+    let body;
+    try {
+        body = await readJsonBody(request, encoding);
+    } catch (error) {
+        console.error("❌ Error reading asset content:", error);
+        return NextResponse.json({ error: "Invalid request body" }, { status: 400 });
+    }
     const updateAsset = updateAssetSchema.safeParse(body);
 
     if (!updateAsset.success) {
@@ -64,7 +89,10 @@ export async function PATCH(request: Request){
         .where(eq(assetTable.id, assetId)).execute();
         
         console.log("✅ Asset content updated successfully");
-        return NextResponse.json({ message: "Asset content updated successfully" }, { status: 200 });
+        return NextResponse.json(
+            { message: "Asset content updated successfully" },
+            { status: 200, headers: { "Accept-Encoding": ACCEPTED_ENCODINGS } },
+        );
         
     } catch (error) {
         console.error("❌ Error updating asset content:", error);